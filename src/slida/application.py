@@ -7,6 +7,7 @@ from PySide6.QtWidgets import QApplication
 
 from slida import __version__
 from slida.config import CombinedConfig, Config
+from slida.debug import print_transition_stats, write_transition_stats
 from slida.qt.application_view import ApplicationView
 from slida.transitions import TRANSITION_PAIRS
 
@@ -21,7 +22,6 @@ def main():
         parser.error(str(e))
 
     parser.add_argument("path", default="", nargs="*")
-    parser.add_argument("--exclude", nargs="*", help="Files or directories to explicitly exclude from the slideshow")
     parser.add_argument("--list-transitions", action="store_true", help="List available transitions and exit")
     parser.add_argument("--print-config", action="store_true", help="Also print debug info about the current config")
     parser.add_argument("--version", "-V", action="store_true", help="Display version and quit")
@@ -60,10 +60,15 @@ def main():
     app.setApplicationName("Slida v" + __version__)
     app.setQuitOnLastWindowClosed(True)
 
-    slida = ApplicationView(args.path, exclude_paths=args.exclude)
+    slida = ApplicationView(args.path)
     slida.show()
+    exit_code = app.exec()
 
-    sys.exit(app.exec())
+    if Config.current().debug.value:
+        print_transition_stats()
+        print(f"Transition stats written to {write_transition_stats()}")
+
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,383 @@
+import argparse
+import dataclasses
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from PySide6.QtCore import QAbstractAnimation, QEvent, QObject, QPointF, QSizeF
+from PySide6.QtGui import QColor, QImage, QLinearGradient, QPainter
+from PySide6.QtWidgets import QApplication, QGraphicsScene
+
+from slida.config import Config
+from slida.files.manager import ImageFileManager
+from slida.qt.application_view import ApplicationView
+from slida.qt.image_screen_widget import ImageScreenWidget
+from slida.transitions import TRANSITION_PAIRS, TransitionPair
+
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+
+
+@dataclasses.dataclass
+class TransitionResult:
+    transition: str
+    resolution: str
+    frames: int
+    mean: float
+    p95: float
+    max: float
+    # Peak of Python/numpy allocations during the run, in MB:
+    allocated: float | None
+    # Peak resident set size, in MB; for the whole process so far, unless the
+    # OS lets it be reset between runs.
+    peak_rss: float | None
+
+    def __str__(self):
+        allocated = f"{self.allocated:8.1f}" if self.allocated is not None else f"{'-':>8s}"
+        peak_rss = f"{self.peak_rss:8.1f}" if self.peak_rss is not None else f"{'-':>8s}"
+        return (
+            f"{self.transition:20s} {self.resolution:6s} {self.frames:6d} {self.mean:8.2f} {self.p95:8.2f} "
+            f"{self.max:8.2f} {allocated} {peak_rss}"
+        )
+
+    @classmethod
+    def from_frame_times(
+        cls,
+        transition: str,
+        resolution: str,
+        frame_times: list[float],
+        allocated: float | None = None,
+    ) -> "TransitionResult":
+        frame_times = sorted(frame_times)
+        return cls(
+            transition=transition,
+            resolution=resolution,
+            frames=len(frame_times),
+            mean=statistics.fmean(frame_times),
+            # Nearest-rank percentile:
+            p95=frame_times[math.ceil(len(frame_times) * 0.95) - 1],
+            max=frame_times[-1],
+            allocated=allocated,
+            peak_rss=_get_peak_rss(),
+        )
+
+    @staticmethod
+    def header() -> str:
+        return (
+            f"{'transition':20s} {'res':6s} {'frames':>6s} {'mean ms':>8s} {'p95 ms':>8s} {'max ms':>8s} "
+            f"{'alloc MB':>8s} {'rss MB':>8s}"
+        )
+
+
+class TransitionBenchmark:
+    """
+    Runs transition pairs between two synthetic screens, one frame at a time:
+    the animation group is paused right after starting, and its current time
+    is then stepped in equal increments, rendering the scene in between. This
+    way every run renders the same frames, regardless of how slow they are.
+    """
+    def __init__(self, image_file_manager: ImageFileManager, frames: int, trace_allocations: bool = True):
+        self.image_file_manager = image_file_manager
+        self.frames = frames
+        self.trace_allocations = trace_allocations
+
+    def run(self, pair_type: type[TransitionPair], resolution: str) -> TransitionResult:
+        width, height = RESOLUTIONS[resolution]
+        _reset_peak_rss()
+        frame_times = self.__run_once(pair_type, QSizeF(width, height))
+        allocated = None
+
+        if self.trace_allocations:
+            # Tracing slows Python code down a lot, so this is a separate run:
+            tracemalloc.start()
+            self.__run_once(pair_type, QSizeF(width, height))
+            allocated = tracemalloc.get_traced_memory()[1] / 1_048_576
+            tracemalloc.stop()
+
+        return TransitionResult.from_frame_times(pair_type.name, resolution, frame_times, allocated=allocated)
+
+    def __run_once(self, pair_type: type[TransitionPair], size: QSizeF) -> list[float]:
+        # Some transitions are randomized; make them do the same thing every
+        # time:
+        random.seed(0)
+        np.random.seed(0)
+
+        holder = QObject()
+        scene = QGraphicsScene(0, 0, size.width(), size.height())
+        exit_widget = ImageScreenWidget(self.image_file_manager, 0, size)
+        enter_widget = ImageScreenWidget(self.image_file_manager, 1, size)
+        scene.addItem(exit_widget)
+        scene.addItem(enter_widget)
+        enter_widget.stackBefore(exit_widget)
+
+        duration = int(Config.current().transition_duration.value * 1000)
+        pair = pair_type(parent=holder, enter_parent=enter_widget, exit_parent=exit_widget, duration=duration)
+        enter_widget.set_transition(pair.enter)
+        exit_widget.set_transition(pair.exit)
+
+        target = QImage(size.toSize(), QImage.Format.Format_RGB32)
+        group = pair.animation_group
+        group.start()
+        group.pause()
+        total = group.totalDuration()
+        frame_times = []
+
+        for frame in range(1, self.frames + 1):
+            group.setCurrentTime(round(total * frame / self.frames))
+            start = time.perf_counter()
+            painter = QPainter(target)
+            scene.render(painter)
+            painter.end()
+            frame_times.append((time.perf_counter() - start) * 1000)
+
+        if group.state() != QAbstractAnimation.State.Stopped:
+            group.stop()
+        for widget in (enter_widget, exit_widget):
+            widget.set_transition(None)
+            scene.removeItem(widget)
+            widget.deleteLater()
+        holder.deleteLater()
+        QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+        return frame_times
+
+
+class ViewBenchmark:
+    """
+    Like TransitionBenchmark, but runs the transitions in a real
+    ApplicationView, stepping them the same way and timing full renders of
+    its viewport (which is what a repaint amounts to, minus flushing it to
+    the screen). This includes everything the view does per frame on top of
+    painting the transitions themselves.
+    """
+    def __init__(self, directory: str, frames: int):
+        self.directory = directory
+        self.frames = frames
+
+    def run(self, pair_types: list[type[TransitionPair]], resolution: str) -> list[TransitionResult]:
+        width, height = RESOLUTIONS[resolution]
+        config = Config.current()
+        view = ApplicationView(self.directory)
+        view.resize(width, height)
+        view.show()
+        results = []
+        _reset_peak_rss()
+
+        try:
+            self.__wait_for(lambda: bool(view.image_view.get_current_filenames()))
+
+            for pair_type in pair_types:
+                random.seed(0)
+                np.random.seed(0)
+                config.transitions.value = {"include": [pair_type.name]}
+                view.move_by(1)
+                transition_pair = view.image_view.transition_pair
+                assert transition_pair is not None
+                group = transition_pair.animation_group
+                group.pause()
+                total = group.totalDuration()
+                target = QImage(view.viewport().size(), QImage.Format.Format_RGB32)
+                frame_times = []
+
+                for frame in range(1, self.frames + 1):
+                    group.setCurrentTime(round(total * frame / self.frames))
+                    start = time.perf_counter()
+                    view.viewport().render(target)
+                    frame_times.append((time.perf_counter() - start) * 1000)
+
+                if group.state() != QAbstractAnimation.State.Stopped:
+                    group.stop()
+                self.__wait_for(lambda: not view.image_view.is_transitioning)
+                QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+                result = TransitionResult.from_frame_times(pair_type.name, resolution, frame_times)
+                results.append(result)
+                print(result, flush=True)
+        finally:
+            view.close()
+            view.deleteLater()
+            QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+        return results
+
+    def __wait_for(self, condition, timeout: float = 10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise TimeoutError("Timed out waiting for the view")
+            QApplication.processEvents()
+            time.sleep(0.001)
+
+
+def create_synthetic_images(directory: Path):
+    """
+    A few gradient filled JPEGs of varying aspect ratios, enough to fill two
+    screens.
+    """
+    for idx, (width, height) in enumerate([(3000, 2000), (2000, 3000), (1600, 2400), (4000, 2250), (2400, 2400)]):
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        gradient = QLinearGradient(QPointF(0, 0), QPointF(width, height))
+        gradient.setColorAt(0.0, QColor.fromHsv(idx * 70 % 360, 200, 220))
+        gradient.setColorAt(1.0, QColor.fromHsv((idx * 70 + 150) % 360, 255, 90))
+        painter = QPainter(image)
+        painter.fillRect(image.rect(), gradient)
+        for circle in range(20):
+            center = QPointF(width * circle / 20, height * ((circle * 7) % 20) / 20)
+            painter.setBrush(QColor.fromHsv(circle * 37 % 360, 180, 255))
+            painter.drawEllipse(center, width / 15, width / 15)
+        painter.end()
+        image.save(str(directory / f"{idx:02d}.jpg"), quality=90)
+
+
+def bench_transitions(args: argparse.Namespace):
+    pair_types = _get_pair_types(args)
+    results: list[TransitionResult] = []
+
+    with tempfile.TemporaryDirectory(prefix="slida-bench-") as directory:
+        create_synthetic_images(Path(directory))
+        image_file_manager = ImageFileManager(directory)
+        benchmark = TransitionBenchmark(image_file_manager, frames=args.frames, trace_allocations=args.allocations)
+        print(TransitionResult.header())
+
+        try:
+            for resolution in args.resolution:
+                for pair_type in pair_types:
+                    result = benchmark.run(pair_type, resolution)
+                    results.append(result)
+                    print(result, flush=True)
+        finally:
+            image_file_manager.close()
+
+    _write_json(args, results)
+
+
+def bench_view(args: argparse.Namespace):
+    pair_types = _get_pair_types(args)
+    results: list[TransitionResult] = []
+    Config.current().auto.value = False
+
+    with tempfile.TemporaryDirectory(prefix="slida-bench-") as directory:
+        create_synthetic_images(Path(directory))
+        benchmark = ViewBenchmark(directory, frames=args.frames)
+        print(TransitionResult.header())
+
+        for resolution in args.resolution:
+            results.extend(benchmark.run(pair_types, resolution))
+
+    _write_json(args, results)
+
+
+def main():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    parser = argparse.ArgumentParser(prog="slida-bench")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    transitions_parser = subparsers.add_parser("transitions", help="Measure frame times of all transitions")
+    view_parser = subparsers.add_parser(
+        "view",
+        help="Measure full repaint times of the application view, while running all transitions",
+    )
+
+    for subparser in (transitions_parser, view_parser):
+        subparser.add_argument(
+            "--transition",
+            "-t",
+            action="append",
+            help="Only benchmark this transition (may be used multiple times)",
+        )
+        subparser.add_argument(
+            "--resolution",
+            "-r",
+            action="append",
+            choices=RESOLUTIONS.keys(),
+            help="Resolution to benchmark at (may be used multiple times; default: all)",
+        )
+        subparser.add_argument("--frames", type=int, default=60, help="Number of frames to render per transition")
+        subparser.add_argument("--duration", type=int, default=1000, help="Nominal transition duration, in ms")
+        subparser.add_argument("--json", help="Also write the results to this JSON file")
+
+    transitions_parser.add_argument(
+        "--allocations",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Measure Python/numpy allocations, in a separate run",
+    )
+    transitions_parser.set_defaults(func=bench_transitions)
+    view_parser.set_defaults(func=bench_view)
+
+    args = parser.parse_args()
+    if not args.resolution:
+        args.resolution = list(RESOLUTIONS)
+
+    app = QApplication([])
+    args.func(args)
+    app.quit()
+
+
+def _get_pair_types(args: argparse.Namespace) -> list[type[TransitionPair]]:
+    """Also sets up the config for benchmarking."""
+    unknown = set(args.transition or []) - {p.name for p in TRANSITION_PAIRS}
+    if unknown:
+        sys.exit(f"Unknown transitions: {', '.join(sorted(unknown))}")
+
+    Config.set_current(Config.from_dict(
+        {
+            "order": "name",
+            "scan-index": False,
+            "streaming": False,
+            "transition-duration": args.duration / 1000,
+        },
+        "BENCH",
+    ))
+
+    return [p for p in TRANSITION_PAIRS if not args.transition or p.name in args.transition]
+
+
+def _get_peak_rss() -> float | None:
+    try:
+        with open("/proc/self/status", "rt", encoding="utf8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Kilobytes on Linux, but bytes on macOS:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1_048_576 if sys.platform == "darwin" else max_rss / 1024
+
+
+def _reset_peak_rss():
+    # Supported by Linux >= 4.0:
+    try:
+        with open("/proc/self/clear_refs", "wt", encoding="utf8") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _write_json(args: argparse.Namespace, results: list[TransitionResult]):
+    if args.json:
+        with open(args.json, "wt", encoding="utf8") as f:
+            json.dump([dataclasses.asdict(result) for result in results], f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import argparse
+import re
 from pathlib import Path
 
 import yaml
@@ -9,9 +10,11 @@ from slida.config.fields import (
     FileOrderConfigField,
     FloatConfigField,
     IntConfigField,
+    PathPatternsConfigField,
     TransitionConfigField,
 )
 from slida.files.file_order import FileOrder
+from slida.files.path_filter import PathPatterns
 
 
 class Config:
@@ -19,18 +22,40 @@ class Config:
     source: str | None
 
     background = BaseConfigField("black", help="For valid values, see: https://doc.qt.io/qt-6/qcolor.html#fromString")
+    display_cache_size = IntConfigField(256, help="Memory budget for images scaled to display size, in MB")
+    exclude = PathPatternsConfigField(
+        list,
+        help="Files or directories to exclude from the slideshow; paths, globs, or regexes prefixed with 're:'",
+    )
+    frame_budget = IntConfigField(
+        16,
+        help="Transitions that take longer than this to paint a frame, in ms, are simplified or skipped (0 = disable)",
+    )
+    include = PathPatternsConfigField(
+        list,
+        help="If set, only include files that match any of these; same syntax as --exclude",
+    )
     interval = IntConfigField(20, help="Auto-advance interval, in seconds", short_name="i")
     max_file_size = IntConfigField(20_000_000, help="Maximum file size (set to 0 to disable)")
+    max_megapixels = IntConfigField(0, help="Maximum image resolution, in megapixels (set to 0 to disable)")
+    min_file_size = IntConfigField(0, help="Minimum file size")
     order = FileOrderConfigField(FileOrder.RANDOM, short_name="o")
+    prefetch = IntConfigField(2, help="Number of upcoming screens to prepare in the background")
+    scan_threads = IntConfigField(8, help="Number of directories to read in parallel when scanning")
+    screen_cache_size = IntConfigField(128, help="Memory budget for composed screens, in MB")
+    source_cache_size = IntConfigField(256, help="Memory budget for full size decoded images, in MB")
     transition_duration = FloatConfigField(0.3, short_name="td", help="In seconds; 0 = no transitions")
     transitions = TransitionConfigField(dict)
     auto = BooleanConfigField(True, help="Enable auto-advance")
-    debug = BooleanConfigField(False, help="Output various debug stuff to console")
+    debug = BooleanConfigField(False, help="Output various debug stuff to console, incl. transition timing stats")
     hidden = BooleanConfigField(False, help="Include hidden files and directories")
     recursive = BooleanConfigField(False, help="Iterate through subdirectories", short_name="R")
     reverse = BooleanConfigField(False, help="Reverse the image order", short_name="r")
+    scan_index = BooleanConfigField(True, help="Cache directory listings on disk, to speed up subsequent scans")
+    streaming = BooleanConfigField(True, help="Start the slideshow while files are still being indexed")
     symlinks = BooleanConfigField(True, help="Follow symlinks")
     tiling = BooleanConfigField(True, help="Tile images horizontally")
+    watch = BooleanConfigField(False, help="Watch the directories for added, changed, and removed images")
 
     def __init__(self, source: str | None = None):
         self.source = source
@@ -54,6 +79,11 @@ class Config:
             raise ValueError("Minimum interval is 1 s.")
         if self.interval.value < self.transition_duration.value:
             raise ValueError("Interval cannot be less than transition duration.")
+        for field_name in ("exclude", "include"):
+            try:
+                PathPatterns(getattr(self, field_name).value)
+            except re.error as e:
+                raise ValueError(f"Invalid regex in {field_name}: {e}") from e
 
     def correct_invalid(self):
         if self.interval.value < self.transition_duration.value:
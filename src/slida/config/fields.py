@@ -151,6 +151,19 @@ class TransitionConfigField(BaseConfigField[TransitionConfig | dict]):
             )
 
 
+class PathPatternsConfigField(BaseConfigField[list[str]]):
+    """See slida.files.path_filter.PathPatterns for the syntax."""
+    def extend_argument_parser(self, parser: argparse.ArgumentParser, name: str):
+        if self.extend_argparse:
+            hyphenated_name = name.replace("_", "-")
+            parser.add_argument(
+                f"--{hyphenated_name}",
+                action="extend",
+                nargs="*",
+                help=self.help,
+            )
+
+
 class IntConfigField(BaseConfigField[int]):
     factory = int
 
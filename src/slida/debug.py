@@ -1,5 +1,15 @@
+import bisect
+import contextlib
+import dataclasses
 import datetime
-from time import time
+import json
+from pathlib import Path
+from time import perf_counter, time
+from typing import ContextManager
+
+import platformdirs
+
+from slida.config import Config
 
 
 live_objects: dict[int, tuple[str, float]] = {}
@@ -20,3 +30,192 @@ def print_live_objects():
     print("LIVE OBJECTS:")
     for obj_id, (obj_name, timestamp) in sorted(live_objects.items(), key=lambda i: i[1][1]):
         print(f"{hex(obj_id)} \t {obj_name} \t {datetime.datetime.fromtimestamp(timestamp)}")
+
+
+class Histogram:
+    """
+    Durations in milliseconds, counted in buckets. Only keeps the bucket
+    counts, so it can be fed indefinitely.
+    """
+    # Upper bounds of the buckets; the last bucket has no upper bound.
+    bounds: tuple[float, ...] = (1, 2, 4, 8, 16, 33, 66, 133, 266, 533)
+
+    count: int = 0
+    counts: list[int]
+    max: float = 0.0
+    total: float = 0.0
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def __str__(self):
+        if not self.count:
+            return "n=0"
+        return (
+            f"n={self.count}, mean={self.mean:.1f}, p95<={self.get_percentile(95)}, max={self.max:.1f} ms | " +
+            " ".join(f"{label}:{count}" for label, count in zip(self.labels, self.counts) if count)
+        )
+
+    @property
+    def labels(self) -> list[str]:
+        return [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def get_percentile(self, percentile: float) -> str:
+        """Returns the label of the bucket the percentile falls in."""
+        threshold = self.count * percentile / 100
+        seen = 0
+        for label, count in zip(self.labels, self.counts):
+            seen += count
+            if seen >= threshold:
+                return label.lstrip("<=")
+        return self.labels[-1]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 3),
+            "max": round(self.max, 3),
+            "buckets": dict(zip(self.labels, self.counts)),
+        }
+
+
+@dataclasses.dataclass
+class TransitionStats:
+    # Times are in milliseconds.
+    frame_gap: Histogram = dataclasses.field(default_factory=Histogram)
+    on_progress: Histogram = dataclasses.field(default_factory=Histogram)
+    paint: Histogram = dataclasses.field(default_factory=Histogram)
+    widget_paint: Histogram = dataclasses.field(default_factory=Histogram)
+    actual_duration: float = 0.0
+    dropped_frames: int = 0
+    frames: int = 0
+    nominal_duration: float = 0.0
+    runs: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "frames": self.frames,
+            "dropped_frames": self.dropped_frames,
+            "nominal_duration": round(self.nominal_duration, 3),
+            "actual_duration": round(self.actual_duration, 3),
+            "frame_gap": self.frame_gap.to_dict(),
+            "on_progress": self.on_progress.to_dict(),
+            "paint": self.paint.to_dict(),
+            "widget_paint": self.widget_paint.to_dict(),
+        }
+
+
+@dataclasses.dataclass
+class TransitionRun:
+    start: float
+    last_frame: float
+
+
+# Keyed by Transition.stats_key:
+transition_stats: dict[str, TransitionStats] = {}
+# Keyed by transition object id:
+transition_runs: dict[int, TransitionRun] = {}
+# Nominal time between frames, in milliseconds; Qt animations run at 60 fps.
+frame_interval: float = 1000 / 60
+
+
+def is_timing_enabled() -> bool:
+    return Config.current().debug.value
+
+
+def get_transition_stats(name: str) -> TransitionStats:
+    stats = transition_stats.get(name)
+    if stats is None:
+        stats = transition_stats[name] = TransitionStats()
+    return stats
+
+
+def measure(name: str, histogram: str) -> ContextManager:
+    """
+    Adds the time spent inside the context to the histogram called
+    `histogram` of the stats for transition `name`. Does nothing unless debug
+    is on.
+    """
+    if not is_timing_enabled():
+        return contextlib.nullcontext()
+    return _measure(get_transition_stats(name), histogram)
+
+
+@contextlib.contextmanager
+def _measure(stats: TransitionStats, histogram: str):
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        getattr(stats, histogram).add((perf_counter() - start) * 1000)
+
+
+def start_transition_run(transition_id: int, name: str):
+    if is_timing_enabled():
+        now = perf_counter()
+        transition_runs[transition_id] = TransitionRun(start=now, last_frame=now)
+        get_transition_stats(name).runs += 1
+
+
+def finish_transition_run(transition_id: int, name: str, nominal_duration: int):
+    run = transition_runs.pop(transition_id, None)
+    if run is not None:
+        stats = get_transition_stats(name)
+        stats.actual_duration += (perf_counter() - run.start) * 1000
+        stats.nominal_duration += nominal_duration
+
+
+def record_transition_frame(transition_id: int, name: str):
+    """
+    To be called on every paint of a transition. Frames that should have been
+    painted in the gap since the previous one count as dropped.
+    """
+    run = transition_runs.get(transition_id)
+    if run is not None:
+        now = perf_counter()
+        gap = (now - run.last_frame) * 1000
+        stats = get_transition_stats(name)
+        stats.frames += 1
+        stats.frame_gap.add(gap)
+        stats.dropped_frames += max(round(gap / frame_interval) - 1, 0)
+        run.last_frame = now
+
+
+def print_transition_stats():
+    print("TRANSITION STATS:")
+    for name, stats in sorted(transition_stats.items()):
+        dropped_pct = stats.dropped_frames / (stats.frames + stats.dropped_frames) * 100 if stats.frames else 0.0
+        print(
+            f"  {name}: {stats.runs} runs, {stats.frames} frames, {stats.dropped_frames} dropped "
+            f"({dropped_pct:.1f}%), {stats.actual_duration:.0f}/{stats.nominal_duration:.0f} ms actual/nominal"
+        )
+        for histogram in ("frame_gap", "on_progress", "paint", "widget_paint"):
+            print(f"    {histogram:13s} {getattr(stats, histogram)}")
+
+
+def write_transition_stats(path: Path | None = None) -> Path:
+    if path is None:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = platformdirs.user_log_path("slida") / f"transition-stats-{timestamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wt", encoding="utf8") as f:
+        json.dump(
+            {
+                "frame_interval": frame_interval,
+                "transitions": {name: stats.to_dict() for name, stats in sorted(transition_stats.items())},
+            },
+            f,
+            indent=2,
+        )
+    return path
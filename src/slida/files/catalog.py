@@ -0,0 +1,264 @@
+import os
+import threading
+from typing import Iterable
+
+import numpy as np
+from numpy.dtypes import StringDType
+
+from slida.files.file_order import FileOrder
+from slida.files.image_file import FileStat, ImageFile, ImageInfo
+
+
+class GrowableArray:
+    """
+    A 1-D numpy array that can be appended to in amortized constant time, by
+    over-allocating the way list does. `view` is only good until the next
+    append.
+    """
+    __array: np.ndarray
+    __fill: object
+    __length: int = 0
+
+    def __init__(self, dtype, fill: object = 0):
+        self.__fill = fill
+        self.__array = np.full(16, fill, dtype=dtype)
+
+    def __getitem__(self, key):
+        # Single values come back as plain Python ones:
+        value = self.view[key]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __len__(self):
+        return self.__length
+
+    @property
+    def view(self) -> np.ndarray:
+        return self.__array[:self.__length]
+
+    def extend(self, values: Iterable | np.ndarray):
+        values = np.asarray(values, dtype=self.__array.dtype)
+        length = self.__length + len(values)
+        if length > len(self.__array):
+            array = np.full(max(length, len(self.__array) * 2), self.__fill, dtype=self.__array.dtype)
+            array[:self.__length] = self.view
+            self.__array = array
+        self.__array[self.__length:length] = values
+        self.__length = length
+
+    def truncate(self, length: int):
+        self.__array[length:self.__length] = self.__fill
+        self.__length = min(length, self.__length)
+
+
+class FileCatalog:
+    """
+    All scanned image files, stored column-wise in numpy arrays indexed by
+    file index, rather than as one ImageFile per file. At millions of files,
+    the per-object overhead of the latter adds up to hundreds of MB. The
+    ImageFiles that actually get shown are made on demand by get().
+
+    Stats are only filled in if the scanner stat'ed the file (see
+    DirScanner), and looked up when sorting needs them otherwise. Image
+    dimensions and validity are filled in by probe(), which reads the file
+    header. Files are never taken out, since that would shift the indices;
+    removed files are just flagged as such, and count as invalid.
+
+    Appending and storing probe results are thread safe; reads are not
+    synchronized, but never see a half-appended row, since the length is
+    updated last.
+    """
+    PROBED = 1
+    VALID = 2
+    CAN_SCALE = 4
+    ROTATED = 8
+    REMOVED = 16
+
+    __ctime: GrowableArray
+    # Parent directory of each file, as an index into `__dirs`:
+    __dir_idx: GrowableArray
+    __dirs: dict[str, int]
+    __flags: GrowableArray
+    __height: GrowableArray
+    __inode: GrowableArray
+    __lock: threading.Lock
+    __mtime: GrowableArray
+    # Paths that can't be stored in `__paths`, since they are not valid
+    # UTF-8 (i.e. contain surrogate escapes); `__paths` has a lossy version
+    # of them, which is good enough for sorting:
+    __odd_paths: dict[int, str]
+    __paths: GrowableArray
+    __size: GrowableArray
+    __width: GrowableArray
+
+    def __init__(self):
+        self.__ctime = GrowableArray(np.float64, np.nan)
+        self.__dir_idx = GrowableArray(np.int32)
+        self.__dirs = {}
+        self.__flags = GrowableArray(np.uint8)
+        self.__height = GrowableArray(np.int32)
+        self.__inode = GrowableArray(np.int64, -1)
+        self.__lock = threading.Lock()
+        self.__mtime = GrowableArray(np.float64, np.nan)
+        self.__odd_paths = {}
+        self.__paths = GrowableArray(StringDType(), "")
+        self.__size = GrowableArray(np.int64, -1)
+        self.__width = GrowableArray(np.int32)
+
+    def __len__(self):
+        return len(self.__flags)
+
+    def aspect_ratio(self, file_idx: int) -> float:
+        return self.__width[file_idx] / self.__height[file_idx]
+
+    def extend(self, image_files: list[ImageFile]) -> range:
+        """Returns the indices of the added files."""
+        with self.__lock:
+            start_idx = len(self)
+            paths = [image_file.path for image_file in image_files]
+            stats = [image_file.cached_stat for image_file in image_files]
+
+            try:
+                self.__paths.extend(paths)
+            except UnicodeEncodeError:
+                for file_idx, path in enumerate(paths, start=start_idx):
+                    try:
+                        self.__paths.extend([path])
+                    except UnicodeEncodeError:
+                        self.__odd_paths[file_idx] = path
+                        self.__paths.extend([path.encode(errors="surrogateescape").decode(errors="replace")])
+
+            self.__dir_idx.extend([
+                self.__dirs.setdefault(path.rpartition("/")[0], len(self.__dirs)) for path in paths
+            ])
+            self.__inode.extend([stat.st_ino if stat else -1 for stat in stats])
+            self.__size.extend([stat.st_size if stat else -1 for stat in stats])
+            self.__mtime.extend([stat.st_mtime if stat else np.nan for stat in stats])
+            self.__ctime.extend([stat.st_ctime if stat else np.nan for stat in stats])
+            self.__width.extend(np.zeros(len(image_files)))
+            self.__height.extend(np.zeros(len(image_files)))
+            # Goes last, since it is what len() goes by:
+            self.__flags.extend(np.zeros(len(image_files)))
+
+            return range(start_idx, len(self))
+
+    def find(self, dir_path: str, recursive: bool = False) -> dict[str, int]:
+        """
+        Returns the files (that are not removed) in `dir_path`, or anywhere
+        below it if `recursive`, as a dict of paths to file indices.
+        """
+        dir_path = dir_path.rstrip("/")
+        prefix = dir_path + "/"
+        dir_indices = [
+            dir_idx for path, dir_idx in list(self.__dirs.items())
+            if path == dir_path or (recursive and path.startswith(prefix))
+        ]
+        length = len(self)
+        mask = np.isin(self.__dir_idx.view[:length], dir_indices) & ((self.__flags.view[:length] & self.REMOVED) == 0)
+        return {self.path(file_idx): file_idx for file_idx in np.flatnonzero(mask).tolist()}
+
+    def get(self, file_idx: int) -> ImageFile:
+        flags = self.__flags[file_idx]
+        info = None
+        if flags & self.PROBED:
+            info = ImageInfo(
+                is_valid=bool(flags & self.VALID),
+                width=self.__width[file_idx],
+                height=self.__height[file_idx],
+                can_scale=bool(flags & self.CAN_SCALE),
+                is_rotated=bool(flags & self.ROTATED),
+            )
+        return ImageFile(self.path(file_idx), info=info)
+
+    def is_valid(self, file_idx: int) -> bool:
+        flags = self.__flags[file_idx]
+        if flags & self.REMOVED:
+            return False
+        if not flags & self.PROBED:
+            flags = self.probe(file_idx)
+        return bool(flags & self.VALID)
+
+    def path(self, file_idx: int) -> str:
+        return self.__odd_paths.get(file_idx) or self.__paths[file_idx]
+
+    def probe(self, file_idx: int) -> int:
+        """Reads the file header and returns the resulting flags."""
+        info = ImageFile(self.path(file_idx)).info
+        flags = (
+            self.PROBED |
+            (self.VALID if info.is_valid else 0) |
+            (self.CAN_SCALE if info.can_scale else 0) |
+            (self.ROTATED if info.is_rotated else 0)
+        )
+        with self.__lock:
+            flags |= self.__flags.view[file_idx] & self.REMOVED
+            self.__width.view[file_idx] = info.width
+            self.__height.view[file_idx] = info.height
+            self.__flags.view[file_idx] = flags
+        return flags
+
+    def remove(self, file_indices: list[int]):
+        with self.__lock:
+            self.__flags.view[file_indices] |= self.REMOVED
+
+    def sort(self, file_indices: np.ndarray, file_order: FileOrder, reverse: bool = False) -> np.ndarray:
+        """
+        Returns `file_indices` sorted by `file_order`. Like sorted(), the sort
+        is stable, also when reversed.
+        """
+        keys = self.__get_sort_keys(file_indices, file_order)
+        if reverse:
+            return file_indices[::-1][np.argsort(keys[::-1], kind="stable")[::-1]]
+        return file_indices[np.argsort(keys, kind="stable")]
+
+    def update_stat(self, file_idx: int, stat: FileStat) -> bool:
+        """
+        If the file has a different stat than the stored one, forgets what
+        was read from its header, so it gets probed again, and returns True.
+        A different inode counts too, since replacing a file by renaming
+        another one onto it may well keep its size and mtime. If no stat was
+        stored, there is no telling, so a file that has been probed counts
+        as changed.
+        """
+        with self.__lock:
+            old_stat = (self.__inode[file_idx], self.__size[file_idx], self.__mtime[file_idx])
+            if old_stat[1] < 0:
+                changed = bool(self.__flags[file_idx] & self.PROBED)
+            else:
+                changed = old_stat != (stat.st_ino, stat.st_size, stat.st_mtime)
+            self.__store_stat(file_idx, stat)
+            if changed:
+                self.__flags.view[file_idx] &= self.REMOVED
+            return changed
+
+    def __get_sort_keys(self, file_indices: np.ndarray, file_order: FileOrder) -> np.ndarray:
+        if file_order == FileOrder.NAME:
+            return np.strings.lower(self.__paths.view[file_indices])
+
+        column = {
+            FileOrder.CREATED: self.__ctime,
+            FileOrder.MODIFIED: self.__mtime,
+            FileOrder.SIZE: self.__size,
+        }.get(file_order)
+        if column is None:
+            raise ValueError(f"{file_order} is not a sortable file order")
+
+        self.__stat_missing(file_indices)
+        return column.view[file_indices]
+
+    def __stat_missing(self, file_indices: np.ndarray):
+        # The scanner only stats files when the configured order needs it.
+        missing = file_indices[self.__size.view[file_indices] < 0]
+        for file_idx in missing.tolist():
+            try:
+                stat = FileStat.from_stat_result(os.stat(self.path(file_idx)))
+            except OSError:
+                # Removed since it was scanned:
+                stat = FileStat(0, 0, 0.0, 0.0)
+            with self.__lock:
+                self.__store_stat(file_idx, stat)
+
+    def __store_stat(self, file_idx: int, stat: FileStat):
+        self.__inode.view[file_idx] = stat.st_ino
+        self.__size.view[file_idx] = stat.st_size
+        self.__mtime.view[file_idx] = stat.st_mtime
+        self.__ctime.view[file_idx] = stat.st_ctime
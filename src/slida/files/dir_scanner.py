@@ -1,108 +1,243 @@
 import mimetypes
 import os
-from typing import Generator
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Collection, Generator
 
 from slida.config import Config
-from slida.files.image_file import ImageFile
+from slida.files.file_order import FileOrder
+from slida.files.image_file import FileStat, ImageFile
+from slida.files.path_filter import PathFilter
+from slida.files.scan_index import IndexedDirEntry, ScanIndex
+
+
+def get_image_extensions() -> frozenset[str]:
+    """
+    Lowercase extensions that mimetypes maps to image/* types, so that
+    telling whether a file is an image is just a set lookup.
+    """
+    mimetypes.init()
+    return frozenset(
+        ext.lower() for ext in [*mimetypes.types_map, *mimetypes.suffix_map]
+        if (mimetypes.guess_file_type("x" + ext)[0] or "").startswith("image/")
+    )
+
+
+IMAGE_EXTENSIONS = get_image_extensions()
+
+_Entry = IndexedDirEntry | str
+# (directory path, its stat, its entries or None if it was only stat'ed):
+_DirResult = tuple[str, os.stat_result, list[IndexedDirEntry] | None]
 
 
 class DirScanner:
+    """
+    Walks the root paths, with all stat() and scandir() calls on directories
+    and files below them done on a thread pool of `scan_threads` threads, so
+    that independent subdirectories are read in parallel. This matters most
+    on network filesystems, where every such call is a round trip.
+
+    Everything else (i.e. deciding what to descend into, loop protection via
+    `__visited_inodes`, and the scan index, which is SQLite and therefore
+    bound to one thread) is done by the thread iterating over scandir(),
+    which yields files in the order their directories are read.
+
+    Files are told apart from directories by the file type that comes with
+    directory listings, and images from other files by their extension.
+    Unless the scan index is used, image files are only stat'ed if the size
+    filters or the file order need it, and otherwise stat'ed lazily (by
+    FileCatalog or ImageFile) if at all. Which files and directories to skip
+    is up to a PathFilter, made from the config when scanning starts.
+    """
     __visited_inodes: set[int]
     __root_paths: list[str]
-    __exclude_paths: set[str]
-
-    def __init__(self, root_paths: str | list[str], exclude_paths: list[str] | None = None):
+    __dirs: list[str]
+    __done: "queue.SimpleQueue[Future[_DirResult]]"
+    __executor: ThreadPoolExecutor | None = None
+    __filter: PathFilter
+    __hidden: bool = False
+    __index: ScanIndex | None = None
+    __pending: int = 0
+    __recursive: bool = False
+    __skip_dirs: Collection[str]
+    __stat_files: bool = True
+    __symlinks: bool = True
+
+    def __init__(self, root_paths: str | list[str], skip_dirs: Collection[str] = ()):
+        """
+        Directories in `skip_dirs` are not descended into, unless they are
+        root paths; e.g. because they have been scanned already.
+        """
         self.__root_paths = root_paths if isinstance(root_paths, list) else [root_paths]
+        self.__skip_dirs = skip_dirs
         self.__visited_inodes = set()
-        self.__exclude_paths = set()
-
-        for exclude in exclude_paths or []:
-            exclude = os.path.abspath(exclude)
-            self.__exclude_paths.add(exclude)
-            if self.__is_symlink(exclude):
-                self.__exclude_paths.add(os.path.realpath(exclude))
-
-    def scandir(self, max_size: int = 0) -> "Generator[ImageFile]":
+        self.__dirs = []
+        self.__done = queue.SimpleQueue()
+
+    @property
+    def dirs(self) -> list[str]:
+        """The directories read so far (or looked up in the index)."""
+        return self.__dirs
+
+    def scandir(self, should_stop: Callable[[], bool] | None = None) -> "Generator[ImageFile]":
+        """
+        `should_stop` is checked before every directory read is handled, so
+        a scan can be stopped without waiting for it to come across an image.
+        """
         config = Config.current()
-        for path in self.__root_paths:
-            yield from self.__scandir(
-                entry=os.path.abspath(path),
-                is_root=True,
-                max_size=max_size,
-                recursive=config.recursive.value,
-                hidden=config.hidden.value,
-                symlinks=config.symlinks.value,
-            )
-
-    def __inode(self, entry: os.DirEntry | str):
-        if isinstance(entry, os.DirEntry):
-            return entry.inode() if not self.__is_symlink(entry) else os.stat(entry.path).st_ino
+        if config.scan_index.value:
+            self.__index = ScanIndex()
+        self.__filter = PathFilter(
+            include=config.include.value,
+            exclude=config.exclude.value,
+            min_size=config.min_file_size.value,
+            max_size=config.max_file_size.value,
+        )
+        self.__hidden = config.hidden.value
+        self.__recursive = config.recursive.value
+        self.__symlinks = config.symlinks.value
+        # The index is shared by scans with different settings, so it needs
+        # the stats in any case:
+        self.__stat_files = (
+            self.__index is not None or
+            self.__filter.needs_size or
+            config.order.value not in (FileOrder.NAME, FileOrder.RANDOM)
+        )
+        self.__executor = ThreadPoolExecutor(max_workers=max(config.scan_threads.value, 1))
+
+        try:
+            for path in self.__root_paths:
+                yield from self.__scan_entry(os.path.abspath(path), is_root=True)
+
+            while self.__pending:
+                if should_stop and should_stop():
+                    return
+                future = self.__done.get()
+                self.__pending -= 1
+                yield from self.__on_dir_read(*future.result())
+        finally:
+            # Also happens when the iteration is abandoned halfway:
+            self.__executor.shutdown(cancel_futures=True)
+            self.__executor = None
+            self.__done = queue.SimpleQueue()
+            self.__pending = 0
+            if self.__index:
+                self.__index.close()
+                self.__index = None
+
+    def __inode(self, entry: _Entry):
+        if isinstance(entry, IndexedDirEntry):
+            return entry.inode()
         return os.stat(entry).st_ino
 
-    def __is_dir(self, entry: os.DirEntry | str):
-        return entry.is_dir() if isinstance(entry, os.DirEntry) else os.path.isdir(entry)
-
-    def __is_file(self, entry: os.DirEntry | str):
-        return entry.is_file() if isinstance(entry, os.DirEntry) else os.path.isfile(entry)
+    def __is_image(self, entry: os.DirEntry | _Entry) -> bool:
+        return os.path.splitext(self.__name(entry))[1].lower() in IMAGE_EXTENSIONS
+
+    def __is_dir(self, entry: _Entry):
+        return entry.is_dir() if not isinstance(entry, str) else os.path.isdir(entry)
+
+    def __is_file(self, entry: _Entry):
+        return entry.is_file() if not isinstance(entry, str) else os.path.isfile(entry)
+
+    def __is_symlink(self, entry: _Entry):
+        return entry.is_symlink() if not isinstance(entry, str) else os.path.islink(entry)
+
+    def __list_dir(self, path: str, dir_stat: os.stat_result | None = None) -> _DirResult:
+        # Runs on the thread pool. Only directories and image files are kept,
+        # with the latter stat'ed right away if needed, so nothing that
+        # follows has to touch the filesystem. Hidden and symlinked entries
+        # are kept too, since the index is shared by scans with different
+        # settings.
+        if dir_stat is None:
+            dir_stat = os.stat(path)
+        entries: list[IndexedDirEntry] = []
+        with os.scandir(path) as dir:
+            for subentry in dir:
+                if subentry.is_dir():
+                    entries.append(IndexedDirEntry.from_dir_entry(subentry))
+                elif subentry.is_file() and self.__is_image(subentry):
+                    if self.__stat_files:
+                        entries.append(IndexedDirEntry.from_dir_entry(subentry, with_stat=True))
+                    else:
+                        entries.append(IndexedDirEntry.from_file_entry(subentry))
+        return path, dir_stat, entries
+
+    def __name(self, entry: os.DirEntry | _Entry) -> str:
+        return entry.name if not isinstance(entry, str) else entry.split("/")[-1]
+
+    def __on_dir_read(
+        self,
+        path: str,
+        dir_stat: os.stat_result,
+        entries: list[IndexedDirEntry] | None,
+    ) -> "Generator[ImageFile]":
+        # With an index, a directory is first only stat'ed (and checked
+        # against the visited inodes); it is listed in a second round trip
+        # only if the index doesn't have it. Without one, it is stat'ed and
+        # listed in one go.
+        if entries is None or self.__index is None:
+            if dir_stat.st_ino in self.__visited_inodes:
+                return
+            self.__visited_inodes.add(dir_stat.st_ino)
+            self.__dirs.append(path)
 
-    def __is_symlink(self, entry: os.DirEntry | str):
-        return entry.is_symlink() if isinstance(entry, os.DirEntry) else os.path.islink(entry)
+        if self.__index is not None:
+            if entries is None:
+                entries = self.__index.get_entries(path, dir_stat)
+                if entries is None:
+                    self.__submit(self.__list_dir, path, dir_stat)
+                    return
+            else:
+                self.__index.set_entries(path, dir_stat, entries)
 
-    def __name(self, entry: os.DirEntry | str) -> str:
-        return entry.name if isinstance(entry, os.DirEntry) else entry.split("/")[-1]
+        for subentry in entries:
+            yield from self.__scan_entry(subentry)
 
-    def __path(self, entry: os.DirEntry | str) -> str:
-        return entry.path if isinstance(entry, os.DirEntry) else entry
+    def __path(self, entry: os.DirEntry | _Entry) -> str:
+        return entry.path if not isinstance(entry, str) else entry
 
-    def __realpath(self, entry: os.DirEntry | str):
-        return os.path.realpath(entry.path) if isinstance(entry, os.DirEntry) else os.path.realpath(entry)
+    def __scan_entry(self, entry: _Entry, is_root: bool = False) -> "Generator[ImageFile]":
+        path = self.__path(entry)
 
-    def __scandir(
-        self,
-        entry: os.DirEntry | str,
-        hidden: bool,
-        symlinks: bool,
-        recursive: bool,
-        is_root: bool = False,
-        max_size: int = 0,
-    ) -> "Generator[ImageFile]":
-        if any(
-            ex for ex in self.__exclude_paths
-            if self.__path(entry).startswith(ex)
-            or (is_root and self.__realpath(entry).startswith(ex))
-        ):
-            return
-
-        if not is_root:
-            if not hidden and self.__name(entry).startswith("."):
+        if is_root:
+            if not self.__filter.accepts_root(path):
+                return
+        else:
+            if not self.__hidden and self.__name(entry).startswith("."):
                 return
-            if not symlinks and self.__is_symlink(entry):
+            if not self.__symlinks and self.__is_symlink(entry):
                 return
 
         if self.__is_dir(entry):
-            if is_root or recursive:
-                inode = self.__inode(entry)
-                if inode not in self.__visited_inodes:
-                    self.__visited_inodes.add(inode)
-                    with os.scandir(entry) as dir:
-                        for subentry in dir:
-                            yield from self.__scandir(
-                                entry=subentry,
-                                max_size=max_size,
-                                hidden=hidden,
-                                symlinks=symlinks,
-                                recursive=recursive,
-                            )
+            if is_root or (self.__recursive and path not in self.__skip_dirs and self.__filter.accepts_dir(path)):
+                # Always stat the directory itself, since the index needs its
+                # mtime anyway:
+                if self.__index is not None:
+                    self.__submit(self.__stat_dir, path)
+                else:
+                    self.__submit(self.__list_dir, path)
 
         elif self.__is_file(entry):
-            mimetype = mimetypes.guess_file_type(self.__path(entry))
-            if mimetype[0] is not None and mimetype[0].startswith("image/"):
+            # Listed files are only kept if they are images:
+            if (isinstance(entry, IndexedDirEntry) or self.__is_image(entry)) and self.__filter.accepts_file(path):
                 inode = self.__inode(entry)
                 if inode not in self.__visited_inodes:
                     stat = self.__stat(entry)
                     self.__visited_inodes.add(inode)
-                    if max_size == 0 or stat.st_size <= max_size:
-                        yield ImageFile(path=self.__path(entry), stat=stat)
-
-    def __stat(self, entry: os.DirEntry | str) -> os.stat_result:
-        return entry.stat() if isinstance(entry, os.DirEntry) else os.stat(entry)
+                    if not self.__filter.needs_size or (stat is not None and self.__filter.accepts_size(stat.st_size)):
+                        yield ImageFile(path=path, stat=stat)
+
+    def __stat(self, entry: _Entry) -> os.stat_result | FileStat | None:
+        if isinstance(entry, IndexedDirEntry):
+            return entry.file_stat
+        return os.stat(entry) if self.__stat_files else None
+
+    def __stat_dir(self, path: str) -> _DirResult:
+        # Runs on the thread pool.
+        return path, os.stat(path), None
+
+    def __submit(self, fn, *args):
+        assert self.__executor is not None
+        future = self.__executor.submit(fn, *args)
+        future.add_done_callback(self.__done.put)
+        self.__pending += 1
@@ -0,0 +1,69 @@
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal, Slot
+
+
+class DirWatcher(QObject):
+    """
+    Watches directories for entries being added, removed, or renamed, with
+    QFileSystemWatcher (i.e. inotify on Linux). Each directory is watched on
+    its own, so subdirectories have to be added too. Changes tend to come in
+    bursts, so they are collected and reported through `dirs_changed` in
+    batches, `delay` seconds after the first one.
+
+    Note that writing to a file doesn't count as a change to its directory;
+    touching it (on Linux), or replacing it, does.
+    """
+    __changed: set[str]
+    __dirs: set[str]
+    __timer: QTimer
+    __watcher: QFileSystemWatcher
+
+    delay: float = 1.0
+
+    dirs_changed = Signal(list)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self.__changed = set()
+        self.__dirs = set()
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.__on_timeout)
+        self.__watcher = QFileSystemWatcher(self)
+        self.__watcher.directoryChanged.connect(self.__on_directory_changed)
+
+    @property
+    def dirs(self) -> set[str]:
+        return self.__dirs
+
+    def add_dirs(self, paths: list[str]):
+        paths = [path for path in paths if path not in self.__dirs]
+        if paths:
+            failed = self.__watcher.addPaths(paths)
+            self.__dirs.update(paths)
+            self.__dirs.difference_update(failed)
+            if failed:
+                # Most likely, fs.inotify.max_user_watches has been reached:
+                print(f"Could not watch {len(failed)} directories, e.g. {failed[0]}")
+
+    def remove_dirs(self, path: str):
+        """Stops watching `path` and everything below it."""
+        paths = [p for p in self.__dirs if p == path or p.startswith(path.rstrip("/") + "/")]
+        if paths:
+            self.__watcher.removePaths(paths)
+            self.__dirs.difference_update(paths)
+
+    def schedule(self, path: str, delay: float):
+        """Reports `path` as changed in `delay` seconds, come what may."""
+        QTimer.singleShot(round(delay * 1000), self, lambda: self.__on_directory_changed(path))
+
+    @Slot(str)
+    def __on_directory_changed(self, path: str):
+        self.__changed.add(path)
+        if not self.__timer.isActive():
+            self.__timer.start(round(self.delay * 1000))
+
+    @Slot()
+    def __on_timeout(self):
+        changed = sorted(self.__changed)
+        self.__changed = set()
+        self.dirs_changed.emit(changed)
@@ -1,20 +1,75 @@
 import os
+from typing import NamedTuple
 
 from PySide6.QtCore import QSize
-from PySide6.QtGui import QImageReader, QPixmap, QPixmapCache
+from PySide6.QtGui import QImage, QImageIOHandler, QImageReader
 
 from slida.config.base import Config
+from slida.qt.image_cache import source_cache
+
+
+class FileStat(NamedTuple):
+    st_ino: int
+    st_size: int
+    st_mtime: float
+    st_ctime: float
+
+    @classmethod
+    def from_stat_result(cls, stat: "os.stat_result | FileStat") -> "FileStat":
+        if isinstance(stat, FileStat):
+            return stat
+        return cls(stat.st_ino, stat.st_size, stat.st_mtime, stat.st_ctime)
+
+
+class ImageInfo(NamedTuple):
+    """What reading the file header says about an image."""
+    is_valid: bool
+    width: int = 0
+    height: int = 0
+    can_scale: bool = False
+    is_rotated: bool = False
 
 
 class ImageFile:
     path: str
-    stat: os.stat_result
+    __can_scale: bool = False
+    __is_rotated: bool = False
     __is_valid: bool | None = None
     __size: QSize | None = None
+    __stat: FileStat | None = None
 
-    def __init__(self, path: str, stat: os.stat_result):
+    def __init__(self, path: str, stat: os.stat_result | FileStat | None = None, info: ImageInfo | None = None):
+        """`info` saves reading the header again, if that has been done."""
         self.path = path
-        self.stat = stat
+        if stat is not None:
+            self.__stat = FileStat.from_stat_result(stat)
+        if info is not None:
+            self.__is_valid = info.is_valid
+            self.__can_scale = info.can_scale
+            self.__is_rotated = info.is_rotated
+            if info.is_valid:
+                self.__size = QSize(info.width, info.height)
+
+    @property
+    def aspect_ratio(self) -> float:
+        return self.size.width() / self.size.height()
+
+    @property
+    def cached_stat(self) -> FileStat | None:
+        """`stat`, or None if the file has not been stat'ed."""
+        return self.__stat
+
+    @property
+    def info(self) -> ImageInfo:
+        if not self.is_valid:
+            return ImageInfo(is_valid=False)
+        return ImageInfo(
+            is_valid=True,
+            width=self.size.width(),
+            height=self.size.height(),
+            can_scale=self.__can_scale,
+            is_rotated=self.__is_rotated,
+        )
 
     @property
     def is_valid(self) -> bool:
@@ -23,14 +78,9 @@ class ImageFile:
         return self.__is_valid
 
     @property
-    def qpixmap(self):
-        pm = QPixmap()
-        if not QPixmapCache.find(self.path, pm):
-            reader = QImageReader(self.path)
-            reader.setAutoTransform(True)
-            pm = QPixmap.fromImageReader(reader)
-            QPixmapCache.insert(self.path, pm)
-        return pm
+    def qimage(self) -> QImage:
+        """Decodes to QImage rather than QPixmap, so it works in any thread."""
+        return self.__get_source_qimage()
 
     @property
     def size(self) -> QSize:
@@ -38,6 +88,16 @@ class ImageFile:
         assert self.__size is not None
         return self.__size
 
+    @property
+    def stat(self) -> FileStat:
+        """
+        The scanner leaves this out when nothing it does needs it, in which
+        case the file is stat'ed on first access.
+        """
+        if self.__stat is None:
+            self.__stat = FileStat.from_stat_result(os.stat(self.path))
+        return self.__stat
+
     def __eq__(self, other):
         return isinstance(other, self.__class__) and other.path == self.path
 
@@ -47,14 +107,79 @@ class ImageFile:
     def __repr__(self):
         return f"<ImageFile path={self.path}>"
 
+    def get_scaled_qimage(self, height: int, screen_idx: int | None = None) -> QImage:
+        """
+        Decodes the image at (or close to) `height` pixels. Handlers that
+        support it (notably JPEG, which can use DCT scaling) decode straight to
+        the requested size, which is a lot faster and uses a lot less memory
+        than decoding at full size and scaling down afterwards.
+        """
+        self.__validate()
+
+        if not self.__can_scale:
+            return self.__get_source_qimage(screen_idx).scaledToHeight(height)
+
+        # Scaling is done before any EXIF transformation is applied:
+        scaled_size = QSize(max(round(self.scaled_width(height)), 1), height)
+        if self.__is_rotated:
+            scaled_size.transpose()
+
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        reader.setScaledSize(scaled_size)
+
+        return reader.read()
+
     def scaled_width(self, height: float) -> float:
         return self.size.width() * (height / self.size.height())
 
+    def __get_source_qimage(self, screen_idx: int | None = None) -> QImage:
+        image = source_cache.find(self.path, screen_idx)
+        if image is None:
+            reader = QImageReader(self.path)
+            reader.setAutoTransform(True)
+            image = reader.read()
+            source_cache.insert(self.path, image, [self.path], screen_idx)
+        return image
+
+    def __probe_size(self) -> QSize:
+        """
+        Gets the image dimensions from the file header, with EXIF orientation
+        taken into account, without decoding any pixel data. Falls back to a
+        full decode for formats whose handlers can't do this.
+        """
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        if not reader.canRead():
+            return QSize()
+
+        size = reader.size()
+
+        if not size.isValid():
+            return self.qimage.size()
+
+        self.__can_scale = reader.supportsOption(QImageIOHandler.ImageOption.ScaledSize)
+        if reader.transformation() & QImageIOHandler.Transformation.TransformationRotate90:
+            self.__is_rotated = True
+            size.transpose()
+
+        return size
+
     def __validate(self):
         if self.__is_valid is None:
             if Config.current().debug.value:
                 print(f"ImageFile.validate ({self.path})")
-            pm = self.qpixmap
-            self.__is_valid = not pm.isNull() and pm.height() > 0 and pm.width() > 0
+            size = self.__probe_size()
+            megapixels = size.width() * size.height() / 1_000_000
+            max_megapixels = Config.current().max_megapixels.value
+            allocation_limit = QImageReader.allocationLimit()
+            self.__is_valid = (
+                size.height() > 0 and
+                size.width() > 0 and
+                (not max_megapixels or megapixels <= max_megapixels) and
+                # Full decodes of anything above this would fail anyway (32
+                # bits per pixel assumed):
+                (self.__can_scale or not allocation_limit or megapixels * 4 <= allocation_limit)
+            )
             if self.__is_valid:
-                self.__size = pm.size()
+                self.__size = size
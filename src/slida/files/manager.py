@@ -1,98 +1,287 @@
-import dataclasses
 import itertools
+import os
 import random
-from typing import Generator
+import time
 
-from PySide6.QtCore import QSizeF
+import numpy as np
+from PySide6.QtCore import QObject, QSizeF, Signal, Slot
 
 from slida.config import Config
+from slida.files.catalog import FileCatalog, GrowableArray
 from slida.files.dir_scanner import DirScanner
+from slida.files.dir_watcher import DirWatcher
 from slida.files.file_order import FileOrder
-from slida.files.image_file import ImageFile
+from slida.files.image_file import FileStat, ImageFile
+from slida.files.scan_thread import ScanThread
+from slida.files.screen_plan import ScreenPlan, ScreenPlanner
+from slida.qt.image_cache import display_cache, screen_cache, source_cache
 from slida.qt.image_screen import ImageScreen
-from slida.utils import NoImagesFound
+from slida.qt.screen_loader import ScreenLoader
+from slida.utils import ImagesPending, NoImagesFound
 
 
-@dataclasses.dataclass
-class Screen:
-    iteration: int
-    file_indices: list[int] = dataclasses.field(default_factory=list)
+class ImageFileManager(QObject):
+    """
+    `__catalog` is append-only, so file indices (which is what the screen
+    plan stores) stay valid while files are still coming in from the scanner.
+    The actual slideshow order is kept in `__order`, as an array of file
+    indices; which of them go on which screen is up to `__plan`. Files from
+    `__merged_count` and on have not been sorted into `__order` yet.
 
+    With the `watch` setting, the scanned directories are watched once the
+    scan is done, and changes are applied without rescanning anything but
+    the changed directories (see `__on_dirs_changed()`).
+    """
+    __catalog: FileCatalog
+    __dir_scanner: DirScanner | None = None
+    __merged_count: int = 0
+    __order: GrowableArray
+    __plan: ScreenPlan
+    __planner: ScreenPlanner
+    __screen_loader: ScreenLoader
+    __scan_thread: ScanThread | None = None
+    # The highest screen index that has been asked for from the outside, i.e.
+    # shown (or about to be); screens up to it are never planned again, even
+    # if the user has gone back since:
+    __shown_idx: int = -1
+    __watcher: DirWatcher | None = None
 
-class ImageFileManager:
-    __image_files: list[ImageFile]
-    __screens: list[Screen]
+    # How many screens to plan ahead of the current one, once scanning is
+    # done. While scanning, only the screens that get prefetched are planned,
+    # so new files still get a chance to show up soon.
+    plan_ahead: int = 100
+    # New files are only added once they have gone this many seconds without
+    # changing, as they may still be being written otherwise:
+    settle_time: float = 2.0
 
-    def __init__(self, path: str | list[str], exclude_paths: list[str] | None = None):
-        self.__screens = []
-        self.__set_path(path, exclude_paths=exclude_paths)
+    files_added = Signal(int)
+    scan_finished = Signal()
+
+    def __init__(self, path: str | list[str], parent: QObject | None = None):
+        super().__init__(parent)
+        self.__catalog = FileCatalog()
+        self.__order = GrowableArray(np.int64)
+        self.__plan = ScreenPlan(self.__catalog, self.__order)
+        self.__planner = ScreenPlanner(self.__plan, parent=self)
+        self.__screen_loader = ScreenLoader(ahead=Config.current().prefetch.value)
+        self.__planner.start()
+        self.__set_path(path)
+
+    @property
+    def is_scanning(self) -> bool:
+        return self.__plan.is_scanning
+
+    def close(self):
+        if self.__scan_thread:
+            self.__scan_thread.requestInterruption()
+            self.__scan_thread.wait()
+        if self.__watcher:
+            self.__watcher.deleteLater()
+            self.__watcher = None
+        self.__planner.stop()
+        self.__screen_loader.stop()
 
     def get_image_screen(self, screen_idx: int, bounds: QSizeF) -> ImageScreen:
-        image_screen = ImageScreen(bounds)
-
-        for file_idx, image in self.__iter_image_files(screen_idx):
-            new_image_screen = ImageScreen(bounds, *image_screen.images, image)
-            if new_image_screen.area > image_screen.area:
-                image_screen = new_image_screen
-                self.__screens[screen_idx].file_indices.append(file_idx)
-            if not image_screen.can_fit_more:
+        self.__shown_idx = max(self.__shown_idx, screen_idx)
+        return self.__get_image_screen(screen_idx, bounds)
+
+    def prefetch(self, screen_idx: int, bounds: QSizeF):
+        """
+        Sets `screen_idx` as the current position, and starts planning and
+        composing the screens after it in the background.
+        """
+        ahead = self.__screen_loader.ahead
+        self.__shown_idx = max(self.__shown_idx, screen_idx)
+        self.__plan.set_target_length(screen_idx + 1 + (ahead if self.is_scanning else self.plan_ahead))
+        self.__screen_loader.set_position(screen_idx)
+        for cache in (source_cache, display_cache, screen_cache):
+            cache.set_position(screen_idx, behind=self.__screen_loader.behind, ahead=ahead)
+
+        for prefetch_idx in range(screen_idx + 1, screen_idx + ahead + 1):
+            try:
+                self.__get_image_screen(prefetch_idx, bounds)
+            except (ImagesPending, NoImagesFound):
                 break
+            self.__screen_loader.schedule(prefetch_idx)
 
-        if not image_screen.images:
-            raise NoImagesFound()
+    @property
+    def __has_pending(self) -> bool:
+        return self.__merged_count < len(self.__catalog)
 
-        # For caching purposes:
-        image_screen.get_outer_qimage()
+    def __get_image_screen(self, screen_idx: int, bounds: QSizeF) -> ImageScreen:
+        with self.__plan.lock:
+            try:
+                planned_screen = self.__plan.get_screen(screen_idx, bounds)
+            except ImagesPending:
+                if self.__has_pending:
+                    self.__merge_pending()
+                    return self.__get_image_screen(screen_idx, bounds)
+                raise
+            images = [self.__catalog.get(file_idx) for file_idx in planned_screen.file_indices]
 
-        return image_screen
+        return self.__screen_loader.get(screen_idx, ImageScreen(bounds, *images, screen_idx=screen_idx))
 
-    def __align_screen_file_indices(self, new_length: int):
-        self.__screens = self.__screens[:new_length]
-        iteration = self.__get_iteration()
-        while len(self.__screens) < new_length:
-            self.__screens.append(Screen(iteration))
+    def __add_files(self, image_files: list[ImageFile], up_next: bool = False):
+        """
+        With `up_next`, and random order, the files are put first in line
+        instead of being shuffled in with the rest.
+        """
+        with self.__plan.lock:
+            new_indices = self.__catalog.extend(image_files)
+            cursor = self.__plan.cursor
 
-    def __get_iteration(self, last_screen_idx: int | None = None) -> int:
-        screens = self.__screens[:last_screen_idx] if last_screen_idx is not None else self.__screens
-        return screens[-1].iteration if screens else 0
+            if new_indices.start // 1000 < new_indices.stop // 1000:
+                print(f"Indexed {new_indices.stop} files ...")
+
+            if Config.current().order.value == FileOrder.RANDOM:
+                if up_next:
+                    unplanned = self.__order.view[cursor:].copy()
+                    self.__order.truncate(cursor)
+                    self.__order.extend(new_indices)
+                    self.__order.extend(unplanned)
+                else:
+                    # "Inside-out" Fisher-Yates over the part of the order that
+                    # has not been planned yet; keeps it uniformly shuffled
+                    # without having to shift the whole array for every insert:
+                    self.__order.extend(new_indices)
+                    order = self.__order.view
+                    for order_idx in range(len(order) - len(new_indices), len(order)):
+                        swap_idx = random.randint(cursor, order_idx)
+                        order[order_idx], order[swap_idx] = order[swap_idx], order[order_idx]
+                self.__merged_count = new_indices.stop
+            else:
+                # Re-sorting is O(n), so collect new files until they amount
+                # to a decent fraction of the existing ones before merging
+                # them in:
+                pending_count = new_indices.stop - self.__merged_count
+                if not self.is_scanning or pending_count >= (len(self.__order) - cursor) // 4:
+                    self.__merge_pending()
+
+            self.__plan.wake()
+
+        self.files_added.emit(len(image_files))
+
+    def __merge_pending(self):
+        # Only the part of the order that has not been planned yet is touched,
+        # so the cursors stored in the plan stay valid.
+        config = Config.current()
+        with self.__plan.lock:
+            cursor = self.__plan.cursor
+            file_indices = np.concatenate([
+                self.__order.view[cursor:],
+                np.arange(self.__merged_count, len(self.__catalog)),
+            ])
+            self.__order.truncate(cursor)
+            self.__order.extend(self.__catalog.sort(file_indices, config.order.value, reverse=config.reverse.value))
+            self.__merged_count = len(self.__catalog)
+            self.__plan.wake()
 
-    def __get_iteration_used_file_indices(self, iteration: int, last_screen_idx: int) -> list[int]:
-        file_indices = [s.file_indices for s in self.__screens[:last_screen_idx] if s.iteration == iteration]
-        return list(itertools.chain(*file_indices))
+    @Slot(list)
+    def __on_dirs_changed(self, dir_paths: list[str]):
+        """
+        Rescans the changed directories, but not their subdirectories unless
+        they are new, and compares the result to what's in the catalog.
+        Screens that have not been shown yet are planned again, so that the
+        changes show up soon; the ones that have are left alone.
+        """
+        if self.__watcher is None:
+            return
 
-    def __iter_image_files(self, screen_idx: int) -> "Generator[tuple[int, ImageFile]]":
-        self.__align_screen_file_indices(screen_idx + 1)
-        iteration = self.__get_iteration(screen_idx)
-        self.__screens[screen_idx] = Screen(iteration)
+        added: list[ImageFile] = []
+        changed: list[int] = []
+        removed: list[int] = []
+        unsettled: set[str] = set()
 
-        for iteration in (iteration, iteration + 1):
-            self.__screens[screen_idx].iteration = iteration
-            used_indices = self.__get_iteration_used_file_indices(iteration, screen_idx)
+        for dir_path in dir_paths:
+            if not os.path.isdir(dir_path):
+                self.__watcher.remove_dirs(dir_path)
+                removed.extend(self.__catalog.find(dir_path, recursive=True).values())
+                continue
 
-            for file_idx in range(len(self.__image_files)):
-                if file_idx not in used_indices and self.__image_files[file_idx].is_valid:
-                    yield file_idx, self.__image_files[file_idx]
+            known = self.__catalog.find(dir_path)
+            dir_scanner = DirScanner(dir_path, skip_dirs=self.__watcher.dirs)
+            # Scanned in full before anything is compared to the catalog, so
+            # a failed scan leaves no trace:
+            try:
+                image_files = list(dir_scanner.scandir())
+            except OSError:
+                # E.g. the directory, or a new subdirectory, was removed
+                # while being scanned; try again once things have settled:
+                self.__watcher.schedule(dir_path, self.settle_time)
+                continue
 
-    def __set_path(self, path: str | list[str], exclude_paths: list[str] | None = None):
-        image_files: list[ImageFile] = []
-        dir_scanner = DirScanner(path, exclude_paths=exclude_paths)
+            for image_file in image_files:
+                try:
+                    # Not image_file.stat, which may come from the scan index:
+                    stat = FileStat.from_stat_result(os.stat(image_file.path))
+                except OSError:
+                    continue
+                file_idx = known.pop(image_file.path, None)
+                if file_idx is not None:
+                    if self.__catalog.update_stat(file_idx, stat):
+                        changed.append(file_idx)
+                elif time.time() - max(stat.st_mtime, stat.st_ctime) < self.settle_time:
+                    unsettled.add(os.path.dirname(image_file.path))
+                else:
+                    added.append(ImageFile(image_file.path, stat=stat))
+
+            removed.extend(known.values())
+            self.__watcher.add_dirs(dir_scanner.dirs)
+
+        for dir_path in unsettled:
+            self.__watcher.schedule(dir_path, self.settle_time)
+
+        if not (added or changed or removed):
+            return
+
+        with self.__plan.lock:
+            self.__plan.truncate(self.__shown_idx + 1)
+            self.__catalog.remove(removed)
+            for file_idx in changed:
+                path = self.__catalog.path(file_idx)
+                for cache in (source_cache, display_cache, screen_cache):
+                    cache.discard_path(path)
+            if added:
+                self.__add_files(added, up_next=True)
+            self.__plan.wake()
+
+        if Config.current().debug.value:
+            print(f"Watched directories changed: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+
+    @Slot(list)
+    def __on_files_found(self, image_files: list[ImageFile]):
+        self.__add_files(image_files)
+
+    @Slot()
+    def __on_scan_finished(self):
+        with self.__plan.lock:
+            self.__plan.is_scanning = False
+            if self.__has_pending:
+                self.__merge_pending()
+            self.__plan.wake()
+        if self.__scan_thread:
+            self.__scan_thread.deleteLater()
+            self.__scan_thread = None
+        print(f"Indexed {len(self.__catalog)} files.")
+        if self.__dir_scanner and Config.current().watch.value:
+            self.__watcher = DirWatcher(parent=self)
+            self.__watcher.dirs_changed.connect(self.__on_dirs_changed)
+            self.__watcher.add_dirs(self.__dir_scanner.dirs)
+        self.__dir_scanner = None
+        self.scan_finished.emit()
+
+    def __set_path(self, path: str | list[str]):
+        dir_scanner = DirScanner(path)
         config = Config.current()
-        reverse = config.reverse.value
-        file_order = config.order.value
-        max_file_size = config.max_file_size.value
-
-        for file_batch in itertools.batched(dir_scanner.scandir(max_size=max_file_size), n=1000):
-            image_files.extend(file_batch)
-            print(f"Indexed {len(image_files)} files ...")
-
-        if file_order == FileOrder.NAME:
-            self.__image_files = sorted(image_files, key=lambda f: f.path.lower(), reverse=reverse)
-        if file_order == FileOrder.CREATED:
-            self.__image_files = sorted(image_files, key=lambda f: f.stat.st_ctime, reverse=reverse)
-        if file_order == FileOrder.MODIFIED:
-            self.__image_files = sorted(image_files, key=lambda f: f.stat.st_mtime, reverse=reverse)
-        if file_order == FileOrder.RANDOM:
-            random.shuffle(image_files)
-            self.__image_files = image_files
-        if file_order == FileOrder.SIZE:
-            self.__image_files = sorted(image_files, key=lambda f: f.stat.st_size, reverse=reverse)
+        self.__dir_scanner = dir_scanner
+        self.__plan.is_scanning = True
+
+        if config.streaming.value:
+            self.__scan_thread = ScanThread(dir_scanner, parent=self)
+            self.__scan_thread.files_found.connect(self.__on_files_found)
+            self.__scan_thread.finished.connect(self.__on_scan_finished)
+            self.__scan_thread.start()
+        else:
+            for file_batch in itertools.batched(dir_scanner.scandir(), n=1000):
+                self.__add_files(list(file_batch))
+            self.__on_scan_finished()
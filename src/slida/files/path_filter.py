@@ -0,0 +1,113 @@
+import glob
+import os
+import re
+
+
+GLOB_CHARS = re.compile(r"[*?[]")
+
+
+def is_glob(pattern: str) -> bool:
+    return GLOB_CHARS.search(pattern) is not None
+
+
+class PathPatterns:
+    """
+    A list of path patterns, compiled into one set of literal paths and one
+    regex, so that matching a path costs about the same however many
+    patterns there are. There are three kinds of patterns:
+
+    * Regexes, prefixed with `re:`, which are searched for in absolute paths.
+    * Globs, where `**` matches any number of directories. Globs that don't
+      start with `/` (or `~`) may match the end of a path, at any depth;
+      e.g. `*.thumb.jpg` or `**/@eaDir/**`.
+    * Anything else is a literal path, relative to the current directory
+      unless absolute, and matches itself and everything below it. If it is
+      a symlink, the path it points to is included too.
+    """
+    __literals: set[str]
+    __regex: re.Pattern | None = None
+
+    def __init__(self, patterns: list[str]):
+        self.__literals = set()
+        regexes: list[str] = []
+
+        for pattern in patterns:
+            if pattern.startswith("re:"):
+                regexes.append(f".*?(?:{pattern[3:]})")
+            elif is_glob(pattern):
+                pattern = os.path.expanduser(pattern)
+                if not pattern.startswith("/"):
+                    pattern = "**/" + pattern
+                regexes.append(glob.translate(pattern, recursive=True, include_hidden=True))
+            else:
+                path = os.path.abspath(os.path.expanduser(pattern))
+                self.__literals.add(path)
+                if os.path.islink(path):
+                    self.__literals.add(os.path.realpath(path))
+
+        if regexes:
+            self.__regex = re.compile("|".join(f"(?:{regex})" for regex in regexes))
+
+    def __bool__(self):
+        return bool(self.__literals) or self.__regex is not None
+
+    def matches(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Only checks `path` itself, not whether it is below a matching
+        directory (except for globs and regexes that say so), since scanning
+        doesn't descend into those anyway. A directory also matches globs
+        for its contents, e.g. `**/@eaDir/**`.
+        """
+        if path in self.__literals:
+            return True
+        if self.__regex is not None:
+            return self.__regex.match(path) is not None or (is_dir and self.__regex.match(path + "/") is not None)
+        return False
+
+    def matches_or_is_below(self, path: str, is_dir: bool = False) -> bool:
+        """Also checks whether `path` is below any literal path."""
+        return self.matches(path, is_dir) or any(
+            path.startswith(literal + "/") for literal in self.__literals
+        )
+
+
+class PathFilter:
+    """
+    Decides which of the files and directories found when scanning to keep.
+    Excluded directories are not descended into at all. If there are any
+    include patterns, only files that match one of them are kept (all
+    directories are still descended into, unless excluded).
+    """
+    exclude: PathPatterns
+    include: PathPatterns
+    max_size: int
+    min_size: int
+
+    def __init__(self, include: list[str], exclude: list[str], min_size: int = 0, max_size: int = 0):
+        self.exclude = PathPatterns(exclude)
+        self.include = PathPatterns(include)
+        self.max_size = max_size
+        self.min_size = min_size
+
+    @property
+    def needs_size(self) -> bool:
+        return self.min_size > 0 or self.max_size > 0
+
+    def accepts_dir(self, path: str) -> bool:
+        return not self.exclude.matches(path, is_dir=True)
+
+    def accepts_file(self, path: str) -> bool:
+        return not self.exclude.matches(path) and (not self.include or self.include.matches_or_is_below(path))
+
+    def accepts_root(self, path: str) -> bool:
+        """
+        Roots can be anywhere, including below an excluded directory, or be
+        symlinks to one.
+        """
+        realpath = os.path.realpath(path)
+        return not any(
+            self.exclude.matches_or_is_below(p, is_dir=os.path.isdir(p)) for p in {path, realpath}
+        )
+
+    def accepts_size(self, size: int) -> bool:
+        return size >= self.min_size and (self.max_size == 0 or size <= self.max_size)
@@ -0,0 +1,196 @@
+import dataclasses
+import os
+import sqlite3
+from pathlib import Path
+
+import platformdirs
+
+from slida.files.image_file import FileStat
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path BLOB PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    directory BLOB NOT NULL,
+    name BLOB NOT NULL,
+    is_dir INTEGER NOT NULL,
+    is_symlink INTEGER NOT NULL,
+    inode INTEGER,
+    size INTEGER,
+    mtime REAL,
+    ctime REAL,
+    PRIMARY KEY (directory, name)
+) WITHOUT ROWID;
+"""
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class IndexedDirEntry:
+    """
+    Stand-in for os.DirEntry, with just enough information for DirScanner to
+    do its thing without touching the filesystem. Files have `file_stat`
+    set, or, when DirScanner doesn't need their stats, just `file_inode`.
+    """
+    path: str
+    name: str
+    dir: bool
+    symlink: bool
+    file_stat: FileStat | None = None
+    file_inode: int | None = None
+
+    def inode(self) -> int:
+        if self.file_stat is not None:
+            return self.file_stat.st_ino
+        assert self.file_inode is not None
+        return self.file_inode
+
+    def is_dir(self) -> bool:
+        return self.dir
+
+    def is_file(self) -> bool:
+        return self.file_stat is not None or self.file_inode is not None
+
+    def is_symlink(self) -> bool:
+        return self.symlink
+
+    def stat(self) -> FileStat:
+        assert self.file_stat is not None
+        return self.file_stat
+
+    @classmethod
+    def from_dir_entry(cls, entry: os.DirEntry, with_stat: bool = False) -> "IndexedDirEntry":
+        return cls(
+            path=entry.path,
+            name=entry.name,
+            dir=entry.is_dir(),
+            symlink=entry.is_symlink(),
+            file_stat=FileStat.from_stat_result(entry.stat()) if with_stat else None,
+        )
+
+    @classmethod
+    def from_file_entry(cls, entry: os.DirEntry) -> "IndexedDirEntry":
+        """
+        Like from_dir_entry(), but for a file whose stats aren't needed. Its
+        inode comes with the directory listing on POSIX, except for
+        symlinks, whose target has to be stat'ed.
+        """
+        return cls(
+            path=entry.path,
+            name=entry.name,
+            dir=False,
+            symlink=entry.is_symlink(),
+            file_inode=entry.stat().st_ino if entry.is_symlink() else entry.inode(),
+        )
+
+
+class ScanIndex:
+    """
+    Persistent, SQLite backed cache of directory listings. The cached entries
+    of a directory are trusted for as long as the directory's inode and mtime
+    stay the same, which means a warm scan costs one stat() per directory
+    instead of a full listing. Only directories and image files are stored.
+
+    Caveat: modifying a file in place does not change the mtime of its parent
+    directory, so the cached size and timestamps of such a file will be stale
+    until something else in the directory changes.
+    """
+    __connection: sqlite3.Connection
+    __pending_writes: int = 0
+
+    commit_interval: int = 1000
+
+    def __init__(self, path: Path | None = None):
+        if path is None:
+            path = self.default_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__connection = sqlite3.connect(path, timeout=30)
+        self.__connection.executescript(SCHEMA)
+
+    def close(self):
+        self.__connection.commit()
+        self.__connection.close()
+
+    def get_entries(self, dir_path: str, dir_stat: os.stat_result) -> list[IndexedDirEntry] | None:
+        """
+        Returns None if the directory is not indexed, or if it has been
+        changed since it was.
+        """
+        key = os.fsencode(dir_path)
+        row = self.__connection.execute(
+            "SELECT inode, mtime_ns FROM directories WHERE path = ?",
+            (key,),
+        ).fetchone()
+
+        if row is None or row != (dir_stat.st_ino, dir_stat.st_mtime_ns):
+            return None
+
+        cursor = self.__connection.execute(
+            "SELECT name, is_dir, is_symlink, inode, size, mtime, ctime FROM entries WHERE directory = ?",
+            (key,),
+        )
+        entries: list[IndexedDirEntry] = []
+
+        for name, is_dir, is_symlink, inode, size, mtime, ctime in cursor:
+            name = os.fsdecode(name)
+            entries.append(IndexedDirEntry(
+                path=os.path.join(dir_path, name),
+                name=name,
+                dir=bool(is_dir),
+                symlink=bool(is_symlink),
+                file_stat=FileStat(inode, size, mtime, ctime) if not is_dir else None,
+            ))
+
+        return entries
+
+    def set_entries(self, dir_path: str, dir_stat: os.stat_result, entries: list[IndexedDirEntry]):
+        key = os.fsencode(dir_path)
+        new_subdirs = {os.fsencode(e.name) for e in entries if e.dir}
+        old_subdirs = self.__connection.execute(
+            "SELECT name FROM entries WHERE directory = ? AND is_dir = 1",
+            (key,),
+        ).fetchall()
+
+        # Forget everything below subdirectories that no longer exist:
+        for (name,) in old_subdirs:
+            if name not in new_subdirs:
+                self.__delete_tree(os.path.join(key, name))
+
+        self.__connection.execute("DELETE FROM entries WHERE directory = ?", (key,))
+        self.__connection.executemany(
+            "INSERT INTO entries (directory, name, is_dir, is_symlink, inode, size, mtime, ctime) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (key, os.fsencode(e.name), e.dir, e.symlink, *(e.file_stat or (None, None, None, None)))
+                for e in entries
+            ],
+        )
+        self.__connection.execute(
+            "INSERT OR REPLACE INTO directories (path, inode, mtime_ns) VALUES (?, ?, ?)",
+            (key, dir_stat.st_ino, dir_stat.st_mtime_ns),
+        )
+
+        self.__pending_writes += 1
+        if self.__pending_writes >= self.commit_interval:
+            self.__connection.commit()
+            self.__pending_writes = 0
+
+    def __delete_tree(self, key: bytes):
+        # All paths below `key` sort between "key/" and "key0", since "0"
+        # directly follows "/" in ASCII.
+        lower, upper = key + b"/", key + b"0"
+        self.__connection.execute(
+            "DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+            (key, lower, upper),
+        )
+        self.__connection.execute(
+            "DELETE FROM entries WHERE directory = ? OR (directory >= ? AND directory < ?)",
+            (key, lower, upper),
+        )
+
+    @staticmethod
+    def default_path() -> Path:
+        return platformdirs.user_cache_path("slida") / "scan_index.sqlite3"
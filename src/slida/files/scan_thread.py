@@ -0,0 +1,39 @@
+from time import monotonic
+
+from PySide6.QtCore import QObject, QThread, Signal
+
+from slida.files.dir_scanner import DirScanner
+from slida.files.image_file import ImageFile
+
+
+class ScanThread(QThread):
+    """
+    Runs a DirScanner in the background and emits the files it finds in
+    batches. A batch is emitted when it reaches `batch_size` files, or when
+    `batch_interval` seconds have passed since the previous one, so the first
+    files get to the GUI quickly even if they are few and far between.
+    """
+    batch_interval: float = 0.2
+    batch_size: int = 1000
+
+    files_found = Signal(list)
+
+    def __init__(self, dir_scanner: DirScanner, parent: QObject | None = None):
+        super().__init__(parent)
+        self.__dir_scanner = dir_scanner
+
+    def run(self):
+        batch: list[ImageFile] = []
+        last_emit = monotonic()
+
+        for image_file in self.__dir_scanner.scandir(should_stop=self.isInterruptionRequested):
+            if self.isInterruptionRequested():
+                return
+            batch.append(image_file)
+            if len(batch) >= self.batch_size or monotonic() - last_emit >= self.batch_interval:
+                self.files_found.emit(batch)
+                batch = []
+                last_emit = monotonic()
+
+        if batch:
+            self.files_found.emit(batch)
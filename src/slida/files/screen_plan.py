@@ -0,0 +1,237 @@
+import dataclasses
+import threading
+from typing import TYPE_CHECKING, Generator
+
+from PySide6.QtCore import QObject, QSizeF, QThread
+
+from slida.utils import ImagesPending, NoImagesFound
+
+
+if TYPE_CHECKING:
+    from slida.files.catalog import FileCatalog, GrowableArray
+
+
+@dataclasses.dataclass
+class PlannedScreen:
+    iteration: int
+    file_indices: list[int] = dataclasses.field(default_factory=list)
+    # Value of ScreenPlan.cursor right after this screen was planned:
+    cursor: int = 0
+
+
+class ScreenPlan:
+    """
+    Decides which files go on which screen, for one set of bounds, and keeps
+    the result so that screens which have been planned are just looked up.
+    Screens can be planned ahead by a ScreenPlanner thread; `lock` must be
+    held by anyone else modifying `order` or `catalog` (which are shared with,
+    and owned by, ImageFileManager).
+
+    Whether an image improves a screen only depends on the aspect ratios of
+    the images already on it and of the bounds, so this is done with plain
+    arithmetic on aspect ratios instead of building an ImageScreen for every
+    candidate.
+
+    `__used` holds the indices of the files used so far in the iteration of
+    the last planned screen, and `__cursor` is a position in `order` before
+    which all files are either used or invalid. Truncating the plan reverts
+    these to their state at that point.
+    """
+    __bounds_ratio: float = 0.0
+    __catalog: "FileCatalog"
+    __cursor: int = 0
+    __is_stalled: bool = False
+    __order: "GrowableArray"
+    __target_length: int = 0
+    __used: set[int]
+
+    bounds: QSizeF
+    is_scanning: bool = False
+    lock: threading.Condition
+    screens: list[PlannedScreen]
+
+    def __init__(self, catalog: "FileCatalog", order: "GrowableArray"):
+        self.__catalog = catalog
+        self.__order = order
+        self.__used = set()
+        self.bounds = QSizeF()
+        self.lock = threading.Condition(threading.RLock())
+        self.screens = []
+
+    @property
+    def cursor(self) -> int:
+        return self.__cursor
+
+    def get_screen(self, screen_idx: int, bounds: QSizeF) -> PlannedScreen:
+        """
+        If `bounds` differ from the ones the plan was made for, everything
+        from `screen_idx` and on is thrown away and planned again.
+        """
+        with self.lock:
+            if bounds != self.bounds:
+                self.truncate(screen_idx)
+                self.bounds = QSizeF(bounds)
+                self.__bounds_ratio = bounds.width() / bounds.height() if bounds.height() > 0 else 0.0
+            while len(self.screens) <= screen_idx:
+                self.plan_next()
+            return self.screens[screen_idx]
+
+    def plan_ahead(self):
+        """Plans one more screen, if there is reason to."""
+        with self.lock:
+            if not self.__needs_planning():
+                return
+            try:
+                self.plan_next()
+            except (ImagesPending, NoImagesFound):
+                # Wait for something to change (see wake()) before retrying.
+                self.__is_stalled = True
+
+    def plan_next(self) -> PlannedScreen:
+        """
+        Raises ImagesPending if files are still being scanned and the screen
+        could not be filled yet, or NoImagesFound if there was nothing at all
+        to put on it. The plan is left unchanged in both cases.
+        """
+        with self.lock:
+            screen = PlannedScreen(self.__get_iteration())
+            ratio_sum = 0.0
+            self.screens.append(screen)
+            # Don't start over while there may still be unseen files to come:
+            iterations = (screen.iteration,) if self.is_scanning else (screen.iteration, screen.iteration + 1)
+
+            for iteration in iterations:
+                if iteration != screen.iteration:
+                    screen.iteration = iteration
+                    self.__cursor = 0
+                    self.__used = set(screen.file_indices)
+
+                for file_idx in self.__iter_unused_files():
+                    new_ratio_sum = ratio_sum + self.__catalog.aspect_ratio(file_idx)
+                    if self.__get_area(new_ratio_sum) > self.__get_area(ratio_sum):
+                        ratio_sum = new_ratio_sum
+                        screen.file_indices.append(file_idx)
+                        self.__used.add(file_idx)
+                    if not self.__can_fit_more(ratio_sum):
+                        break
+
+                if not self.__can_fit_more(ratio_sum):
+                    break
+
+            screen.cursor = self.__cursor
+
+            if self.is_scanning and (not screen.file_indices or self.__can_fit_more(ratio_sum)):
+                self.truncate(len(self.screens) - 1)
+                # More files may be on the way that would fill it better.
+                raise ImagesPending()
+
+            if not screen.file_indices:
+                self.truncate(len(self.screens) - 1)
+                raise NoImagesFound()
+
+            return screen
+
+    def probe_upcoming(self, count: int):
+        """
+        Gets the next `count` candidates validated (i.e. their headers read)
+        without holding the lock, so the GUI thread isn't kept waiting on disk
+        I/O. Reading `order` without the lock is fine here; the worst thing
+        that can happen is that the wrong files get probed.
+        """
+        for file_idx in self.__order[self.__cursor:self.__cursor + count].tolist():
+            self.__catalog.is_valid(file_idx)
+
+    def set_target_length(self, length: int):
+        with self.lock:
+            self.__target_length = length
+            self.lock.notify_all()
+
+    def truncate(self, length: int):
+        """
+        Pops screens until there are at most `length` left, reverting `__used`
+        and `__cursor` as it goes.
+        """
+        with self.lock:
+            while len(self.screens) > length:
+                screen = self.screens.pop()
+                iteration = self.__get_iteration()
+
+                if screen.iteration == iteration:
+                    self.__used.difference_update(screen.file_indices)
+                    self.__cursor = self.screens[-1].cursor if self.screens else 0
+                else:
+                    # Crossed back into the previous iteration; this is rare
+                    # enough to warrant just rebuilding the state from scratch.
+                    self.__used = {i for s in self.screens if s.iteration == iteration for i in s.file_indices}
+                    self.__cursor = 0
+                    self.__advance_cursor()
+
+            self.wake()
+
+    def wait_for_work(self, timeout: float) -> bool:
+        with self.lock:
+            return self.lock.wait_for(self.__needs_planning, timeout)
+
+    def wake(self):
+        """To be called when something changed that may unstall planning."""
+        with self.lock:
+            self.__is_stalled = False
+            self.lock.notify_all()
+
+    def __advance_cursor(self):
+        while self.__cursor < len(self.__order):
+            file_idx = self.__order[self.__cursor]
+            if file_idx not in self.__used and self.__catalog.is_valid(file_idx):
+                break
+            self.__cursor += 1
+
+    def __can_fit_more(self, ratio_sum: float) -> bool:
+        return self.__bounds_ratio - ratio_sum >= 0.4
+
+    def __get_area(self, ratio_sum: float) -> float:
+        # Area of images with a combined aspect ratio of `ratio_sum`, fitted
+        # inside the bounds, in units of bounds height squared.
+        if ratio_sum <= self.__bounds_ratio:
+            return ratio_sum
+        return self.__bounds_ratio ** 2 / ratio_sum
+
+    def __get_iteration(self) -> int:
+        return self.screens[-1].iteration if self.screens else 0
+
+    def __iter_unused_files(self) -> "Generator[int]":
+        self.__advance_cursor()
+        position = self.__cursor
+
+        while position < len(self.__order):
+            file_idx = self.__order[position]
+            if file_idx not in self.__used and self.__catalog.is_valid(file_idx):
+                yield file_idx
+                if position == self.__cursor:
+                    self.__advance_cursor()
+            position = max(position + 1, self.__cursor)
+
+    def __needs_planning(self) -> bool:
+        return not self.__is_stalled and not self.bounds.isEmpty() and len(self.screens) < self.__target_length
+
+
+class ScreenPlanner(QThread):
+    """
+    Keeps planning screens in the background, up to the plan's target length,
+    so ImageFileManager normally only has to look them up.
+    """
+    probe_count: int = 20
+
+    def __init__(self, plan: ScreenPlan, parent: QObject | None = None):
+        super().__init__(parent)
+        self.__plan = plan
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            if self.__plan.wait_for_work(timeout=0.5):
+                self.__plan.probe_upcoming(self.probe_count)
+                self.__plan.plan_ahead()
+
+    def stop(self):
+        self.requestInterruption()
+        self.__plan.wake()
+        self.wait()
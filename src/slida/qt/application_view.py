@@ -1,13 +1,19 @@
 import math
 import random
+import time
 from typing import TYPE_CHECKING
 
 from klaatu_python.utils import coerce_between
 from PySide6.QtCore import QPointF, QProcess, QRectF, QSize, Qt, QTimer, Slot
 from PySide6.QtGui import (
+    QCloseEvent,
+    QColor,
     QContextMenuEvent,
     QKeyEvent,
     QMouseEvent,
+    QPainter,
+    QPaintEvent,
+    QRegion,
     QResizeEvent,
     QShowEvent,
     QWheelEvent,
@@ -25,8 +31,8 @@ from slida.debug import add_live_object, remove_live_object
 from slida.files.manager import ImageFileManager
 from slida.qt.image_view import ImageView
 from slida.qt.toast import Toast
-from slida.transitions import TRANSITION_PAIRS
-from slida.utils import NoImagesFound
+from slida.transitions import TRANSITION_PAIRS, filter_transition_pairs
+from slida.utils import ImagesPending, NoImagesFound
 
 
 if TYPE_CHECKING:
@@ -49,12 +55,20 @@ class DragTracker:
 
 
 class ApplicationView(QGraphicsView):
+    """
+    Everything that gets zoomed (i.e. the image screens) lives in this view's
+    one scene, managed by `__image_view`. Toasts are plain child widgets on
+    top of it, so they stay unscaled.
+    """
     __buffered_move_delta: int = 0
     __debug_toast: Toast | None = None
     __drag_tracker: DragTracker | None = None
     __history_idx: int = 0
+    __pending_transition: "tuple[type[TransitionPair] | None, float] | None" = None
     __remaining_time_tmp: int | None = None
+    __repaint_count: int = 0
     __show_debug_toast: bool = False
+    __show_repaints: bool = False
     __wheel_delta: int = 0
     __zoom: int = 0
 
@@ -67,7 +81,7 @@ class ApplicationView(QGraphicsView):
     __toasts: list[Toast]
     __transition_duration: float
 
-    def __init__(self, path: str | list[str], exclude_paths: list[str] | None = None):
+    def __init__(self, path: str | list[str]):
         super().__init__()
 
         config = Config.current()
@@ -78,7 +92,9 @@ class ApplicationView(QGraphicsView):
 
         add_live_object(id(self), self.__class__.__name__)
 
-        self.__image_file_manager = ImageFileManager(path, exclude_paths=exclude_paths)
+        self.__image_file_manager = ImageFileManager(path, parent=self)
+        self.__image_file_manager.files_added.connect(self.__on_files_added)
+        self.__image_file_manager.scan_finished.connect(self.__on_files_added)
 
         if self.__show_debug_toast:
             self.__debug_toast = self.create_toast(None, True)
@@ -90,16 +106,20 @@ class ApplicationView(QGraphicsView):
             "[S] Toggle auto-advance"
         )
 
-        self.__image_view = ImageView(self.__image_file_manager)
-        self.__image_view.transition_finished.connect(self.__on_transition_finished)
         scene = QGraphicsScene(self)
+        self.__image_view = ImageView(self.__image_file_manager, scene, parent=self)
+        self.__image_view.transition_finished.connect(self.__on_transition_finished)
 
         self.setScene(scene)
+        self.setBackgroundBrush(QColor.fromString(config.background.value))
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.DefaultContextMenu)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        # Transitions mark only the parts that changed for repaint (see
+        # Transition.update_parent()), which only helps if the view repaints
+        # exactly those and nothing more:
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
         # self.setMouseTracking(False)
-        scene.addWidget(self.__image_view)
 
         if self.__show_debug_toast:
             debug_timer = QTimer(self, interval=200)
@@ -116,6 +136,10 @@ class ApplicationView(QGraphicsView):
         if config.auto.value:
             self.__timer.start()
 
+    @property
+    def image_view(self) -> ImageView:
+        return self.__image_view
+
     @property
     def real_interval_ms(self) -> int:
         return max(int((self.__interval - self.__transition_duration) * 1000), 0)
@@ -124,6 +148,10 @@ class ApplicationView(QGraphicsView):
     def zoom_percent(self) -> int:
         return int(pow(1.4, self.__zoom) * 100)
 
+    def closeEvent(self, event: QCloseEvent):
+        self.__image_file_manager.close()
+        super().closeEvent(event)
+
     def contextMenuEvent(self, event: QContextMenuEvent):
         menu = QMenu(self)
         timer_was_active = self.pause_slideshow()
@@ -221,6 +249,8 @@ class ApplicationView(QGraphicsView):
                 self.nudge_interval(-1)
             elif combo.key() == Qt.Key.Key_Question:
                 self.toggle_help_toast()
+            elif combo.key() == Qt.Key.Key_R and Config.current().debug.value:
+                self.toggle_repaint_overlay()
 
     def mouseMoveEvent(self, event: QMouseEvent):
         super().mouseMoveEvent(event)
@@ -277,6 +307,9 @@ class ApplicationView(QGraphicsView):
         history_idx = self.__history_idx + delta
         self.__remaining_time_tmp = None
 
+        if self.__pending_transition:
+            # Still waiting for the scanner to come up with the current screen.
+            return
         if self.__image_view.is_transitioning:
             self.__buffered_move_delta = delta
         elif history_idx >= 0:
@@ -295,9 +328,18 @@ class ApplicationView(QGraphicsView):
         transition_pair_type: "type[TransitionPair] | None" = None,
         transition_duration: float = 0.0,
     ):
+        self.__pending_transition = None
+
         try:
             self.__image_view.transition_to(self.__history_idx, transition_pair_type, transition_duration)
+        except ImagesPending:
+            self.__pending_transition = transition_pair_type, transition_duration
         except NoImagesFound:
+            if Config.current().watch.value:
+                # Wait for some to turn up:
+                self.__pending_transition = transition_pair_type, transition_duration
+                self.show_toast("No images were found (yet).")
+                return
             box = QMessageBox(text="No images were found.", parent=self)
             box.buttonClicked.connect(self.close, Qt.ConnectionType.QueuedConnection)
             box.exec()
@@ -315,6 +357,13 @@ class ApplicationView(QGraphicsView):
             self.__transition_duration = new_value
             self.show_toast(f"Transition duration: {self.__transition_duration} s")
 
+    def paintEvent(self, event: QPaintEvent):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        self.__image_view.on_frame_painted((time.perf_counter() - start) * 1000)
+        if self.__show_repaints:
+            self.__paint_repaint_overlay(event.region())
+
     def pause_slideshow(self, show_toast: bool = False) -> bool:
         if self.__timer.isActive():
             self.__remaining_time_tmp = self.__timer.remainingTime()
@@ -327,7 +376,7 @@ class ApplicationView(QGraphicsView):
     def resizeEvent(self, event: QResizeEvent):
         rect = self.viewport().rect()
         self.scene().setSceneRect(rect)
-        self.__image_view.setFixedSize(rect.size())
+        self.__image_view.resize(rect.size())
         for toast in self.__toasts:
             toast.setFixedWidth(rect.width())
         self.__place_toasts()
@@ -354,6 +403,11 @@ class ApplicationView(QGraphicsView):
         else:
             self.__help_toast.show()
 
+    def toggle_repaint_overlay(self):
+        self.__show_repaints = not self.__show_repaints
+        self.viewport().update()
+        self.show_toast(f"Repaint overlay {'on' if self.__show_repaints else 'off'}")
+
     def toggle_slideshow(self):
         if self.__timer.isActive():
             self.pause_slideshow(True)
@@ -405,27 +459,11 @@ class ApplicationView(QGraphicsView):
             self.centerOn(self.mapToScene(viewport_center))
 
     def __get_next_transition_pair_type(self):
-        pairs = self.__get_transition_pair_types()
+        pairs = filter_transition_pairs(TRANSITION_PAIRS)
         if not pairs:
             return None
         return random.choice(pairs)
 
-    def __get_transition_pair_types(self):
-        pairs = TRANSITION_PAIRS
-        config = Config.current()
-
-        if config.transitions.value is not None:
-            names = {p.name for p in pairs}
-            include = set(name.replace("_", "-") for name in config.transitions.value.get("include", names))
-            exclude = set(name.replace("_", "-") for name in config.transitions.value.get("exclude", []))
-
-            if "all" not in include:
-                names &= include
-                names -= exclude
-                pairs = [p for p in pairs if p.name in names]
-
-        return pairs
-
     @Slot()
     def __hide_cursor(self):
         QApplication.setOverrideCursor(Qt.CursorShape.BlankCursor)
@@ -438,6 +476,11 @@ class ApplicationView(QGraphicsView):
             )
             self.__debug_toast.show()
 
+    @Slot()
+    def __on_files_added(self):
+        if self.__pending_transition:
+            self.show_current_screen(*self.__pending_transition)
+
     @Slot()
     def __on_timeout(self):
         self.move_by(1)
@@ -455,6 +498,17 @@ class ApplicationView(QGraphicsView):
         process.setArguments([path])
         process.startDetached()
 
+    def __paint_repaint_overlay(self, region: QRegion):
+        # Tints the repainted area, with a new hue for every repaint so that
+        # consecutive ones can be told apart. Whatever isn't repainted keeps
+        # its tint from the last time it was.
+        self.__repaint_count += 1
+        color = QColor.fromHsv(self.__repaint_count * 47 % 360, 255, 255, 64)
+        painter = QPainter(self.viewport())
+        for rect in region:
+            painter.fillRect(rect, color)
+        painter.end()
+
     def __place_toasts(self):
         offset = 0
         for toast in reversed(self.__toasts):
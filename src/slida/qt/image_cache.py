@@ -0,0 +1,122 @@
+import dataclasses
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+from PySide6.QtGui import QImage
+
+from slida.config import Config
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    image: QImage
+    # The files that the image was made from:
+    paths: frozenset[str]
+    size: int
+    screen_idx: int | None
+
+
+class ImageCache:
+    """
+    Thread-safe LRU cache of QImages, limited by total size in bytes. Stands
+    in for QPixmapCache, which may only be used from the GUI thread.
+
+    Entries can be tagged with the index of the screen they were last used
+    for. When evicting, entries belonging to screens outside of the window
+    around the current position (see `set_position()`) go first, in LRU
+    order; only then are entries inside the window evicted.
+    """
+    __entries: "OrderedDict[str, CacheEntry]"
+    __lock: threading.Lock
+    __size: int = 0
+    __window: tuple[int, int] | None = None
+
+    evictions: int = 0
+    hits: int = 0
+    misses: int = 0
+    name: str
+
+    def __init__(self, name: str, get_max_size: Callable[[], int]):
+        self.name = name
+        self.__entries = OrderedDict()
+        self.__get_max_size = get_max_size
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"<ImageCache {self.name}: {len(self.__entries)} entries, "
+            f"{self.__size / 1_048_576:.1f}/{self.max_size / 1_048_576:.1f} MB, hits={self.hits}, "
+            f"misses={self.misses}, evictions={self.evictions}>"
+        )
+
+    @property
+    def max_size(self) -> int:
+        return self.__get_max_size()
+
+    def discard_path(self, path: str):
+        """Removes all entries that were made from the file at `path`."""
+        with self.__lock:
+            for key in [key for key, entry in self.__entries.items() if path in entry.paths]:
+                self.__size -= self.__entries.pop(key).size
+
+    def find(self, key: str, screen_idx: int | None = None) -> QImage | None:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            if screen_idx is not None:
+                entry.screen_idx = screen_idx
+            return entry.image
+
+    def insert(self, key: str, image: QImage, paths: Iterable[str], screen_idx: int | None = None):
+        """`paths` are the files that `image` was made from."""
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__size -= old.size
+            entry = CacheEntry(image=image, paths=frozenset(paths), size=image.sizeInBytes(), screen_idx=screen_idx)
+            self.__entries[key] = entry
+            self.__size += entry.size
+            self.__evict(protected_key=key)
+
+    def set_position(self, screen_idx: int, behind: int, ahead: int):
+        with self.__lock:
+            self.__window = screen_idx - behind, screen_idx + ahead
+
+    def __evict(self, protected_key: str):
+        max_size = self.max_size
+
+        for only_outside_window in (True, False):
+            for key, entry in list(self.__entries.items()):
+                if self.__size <= max_size:
+                    return
+                if key == protected_key or (only_outside_window and self.__is_in_window(entry)):
+                    continue
+                del self.__entries[key]
+                self.__size -= entry.size
+                self.evictions += 1
+
+    def __is_in_window(self, entry: CacheEntry) -> bool:
+        if self.__window is None or entry.screen_idx is None:
+            return False
+        return self.__window[0] <= entry.screen_idx <= self.__window[1]
+
+
+# Decoded images at their original size; only used for formats that can't be
+# decoded straight to display size.
+source_cache = ImageCache("source", lambda: Config.current().source_cache_size.value * 1_048_576)
+# Images decoded/scaled to the size they are displayed at.
+display_cache = ImageCache("display", lambda: Config.current().display_cache_size.value * 1_048_576)
+# Fully composed screens, keyed by bounds, background and files; see
+# ImageScreen.cache_key.
+screen_cache = ImageCache("screen", lambda: Config.current().screen_cache_size.value * 1_048_576)
+
+
+def print_cache_stats():
+    print("IMAGE CACHES:")
+    for cache in (source_cache, display_cache, screen_cache):
+        print(f"  {cache}")
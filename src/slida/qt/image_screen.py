@@ -1,9 +1,11 @@
+import threading
 from typing import TYPE_CHECKING
 
 from PySide6.QtCore import QPointF, QRectF, QSizeF
-from PySide6.QtGui import QImage, QPainter, QPixmap, QPixmapCache
+from PySide6.QtGui import QImage, QPainter
 
 from slida.config.base import Config
+from slida.qt.image_cache import display_cache, screen_cache
 from slida.qt.utils import get_centered_content_rect
 
 
@@ -17,14 +19,17 @@ class ImageScreen:
     can_fit_more: bool
     images: "tuple[ImageFile, ...]"
     inner_rect: QRectF
+    screen_idx: int | None
 
-    __inner_qimage: QImage | None = None
+    __lock: threading.Lock
     __outer_qimage: QImage | None = None
     __size: QSizeF
 
-    def __init__(self, bounds: QSizeF, *images: "ImageFile"):
+    def __init__(self, bounds: QSizeF, *images: "ImageFile", screen_idx: int | None = None):
         self.bounds = bounds
         self.images = images
+        self.screen_idx = screen_idx
+        self.__lock = threading.Lock()
         self.__size = self.__get_size()
         self.area = self.__size.width() * self.__size.height()
         bounds_ratio = self.bounds.width() / self.bounds.height() if self.bounds.height() > 0 else 0.0
@@ -32,42 +37,64 @@ class ImageScreen:
         self.can_fit_more = bounds_ratio - images_ratio >= 0.4
         self.inner_rect = get_centered_content_rect(bounds, self.__size)
 
+    def __eq__(self, other):
+        return isinstance(other, ImageScreen) and other.bounds == self.bounds and other.images == self.images
+
+    @property
+    def cache_key(self) -> str:
+        size = self.bounds.toSize()
+        paths = "\0".join(image.path for image in self.images)
+        return f"{size.width()}x{size.height()}:{Config.current().background.value}:{paths}"
+
+    @property
+    def is_composed(self) -> bool:
+        return self.__outer_qimage is not None
+
     def get_outer_qimage(self) -> QImage:
-        if self.__outer_qimage is None:
-            self.__outer_qimage = QImage(self.bounds.toSize(), QImage.Format.Format_RGB32)
-            self.__outer_qimage.fill(Config.current().background.value)
-            if not self.__size.isEmpty():
-                qpainter = QPainter(self.__outer_qimage)
-                content = self.__get_inner_qimage()
-                qpainter.drawImage(self.inner_rect.topLeft(), content)
-                qpainter.end()
-        return self.__outer_qimage
-
-    def __get_inner_qimage(self) -> QImage:
-        if self.__inner_qimage is None:
-            config = Config.current()
-            self.__inner_qimage = QImage(self.__size.toSize(), QImage.Format.Format_RGB32)
-            self.__inner_qimage.fill(config.background.value)
-            qpainter = QPainter(self.__inner_qimage)
-            left = 0
-            height = self.__size.toSize().height()
-
-            for image in self.images:
-                if config.debug.value:
-                    print(f"Painting {image.path} (file size={image.stat.st_size}, image size={image.size})")
-                cache_key = f"{image.path}:{height}"
-                qpixmap = QPixmap()
-
-                if not QPixmapCache.find(cache_key, qpixmap):
-                    qpixmap = image.qpixmap.scaledToHeight(height)
-                    QPixmapCache.insert(cache_key, qpixmap)
-
-                qpainter.drawPixmap(QPointF(left, 0), qpixmap)
-                left += qpixmap.width()
-
-            qpainter.end()
-
-        return self.__inner_qimage
+        # May be called from a ScreenLoader worker thread and the GUI thread at
+        # the same time; the latter will then just wait for the result.
+        with self.__lock:
+            if self.__outer_qimage is None:
+                cache_key = self.cache_key
+                outer_qimage = screen_cache.find(cache_key, self.screen_idx)
+
+                if outer_qimage is None:
+                    outer_qimage = QImage(self.bounds.toSize(), QImage.Format.Format_RGB32)
+                    outer_qimage.fill(Config.current().background.value)
+                    if not self.__size.isEmpty():
+                        qpainter = QPainter(outer_qimage)
+                        content = self.__compose_inner_qimage()
+                        qpainter.drawImage(self.inner_rect.topLeft(), content)
+                        qpainter.end()
+                    paths = [image.path for image in self.images]
+                    screen_cache.insert(cache_key, outer_qimage, paths, self.screen_idx)
+
+                self.__outer_qimage = outer_qimage
+            return self.__outer_qimage
+
+    def __compose_inner_qimage(self) -> QImage:
+        config = Config.current()
+        inner_qimage = QImage(self.__size.toSize(), QImage.Format.Format_RGB32)
+        inner_qimage.fill(config.background.value)
+        qpainter = QPainter(inner_qimage)
+        left = 0
+        height = self.__size.toSize().height()
+
+        for image in self.images:
+            if config.debug.value:
+                print(f"Painting {image.path} (file size={image.stat.st_size}, image size={image.size})")
+            cache_key = f"{image.path}:{height}"
+            scaled = display_cache.find(cache_key, self.screen_idx)
+
+            if scaled is None:
+                scaled = image.get_scaled_qimage(height, self.screen_idx)
+                display_cache.insert(cache_key, scaled, [image.path], self.screen_idx)
+
+            qpainter.drawImage(QPointF(left, 0), scaled)
+            left += scaled.width()
+
+        qpainter.end()
+        return inner_qimage
 
     def __get_size(self) -> QSizeF:
         height = self.bounds.height()
@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING
 
-from PySide6.QtCore import QSizeF
-from PySide6.QtGui import QImage, QPainter
+from PySide6.QtCore import QRectF, QSizeF
+from PySide6.QtGui import QImage, QPainter, QPixmap
 from PySide6.QtWidgets import (
     QGraphicsSceneResizeEvent,
     QGraphicsWidget,
@@ -9,7 +9,13 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
-from slida.debug import add_live_object, remove_live_object
+from slida.debug import (
+    add_live_object,
+    measure,
+    record_transition_frame,
+    remove_live_object,
+)
+from slida.utils import ImagesPending
 
 
 if TYPE_CHECKING:
@@ -19,8 +25,15 @@ if TYPE_CHECKING:
 
 
 class ImageScreenWidget(QGraphicsWidget):
+    """
+    Keeps the screen both as a QImage, for transitions that work on the
+    pixels, and as a QPixmap, which is what actually gets painted most of the
+    time. The pixmap is created once per screen (and size), so that the
+    conversion to the paint device's format isn't redone on every paint.
+    """
     __image_file_manager: "ImageFileManager"
     __image_screen: "ImageScreen"
+    __pixmap: QPixmap
     __qimage: QImage
     __screen_idx: int
     __transition: "Transition | None" = None
@@ -29,7 +42,7 @@ class ImageScreenWidget(QGraphicsWidget):
         self.__screen_idx = screen_idx
         self.__image_file_manager = image_file_manager
         self.__image_screen = image_file_manager.get_image_screen(screen_idx, size)
-        self.__qimage = self.__image_screen.get_outer_qimage()
+        self.__set_qimage(self.__image_screen.get_outer_qimage())
         super().__init__(size=size)
         add_live_object(id(self), self.__class__.__name__)
 
@@ -43,16 +56,29 @@ class ImageScreenWidget(QGraphicsWidget):
         return [i.path for i in self.__image_screen.images]
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None):
-        if self.__transition:
-            self.__transition.paint(painter, self.__qimage, self.__image_screen.inner_rect)
-        else:
-            painter.drawImage(self.rect(), self.__qimage)
+        stats_key = self.__transition.stats_key if self.__transition else "none"
+
+        with measure(stats_key, "widget_paint"):
+            if self.__transition:
+                record_transition_frame(id(self.__transition), stats_key)
+                with measure(stats_key, "paint"):
+                    self.__transition.paint(
+                        painter,
+                        self.__qimage,
+                        self.__pixmap,
+                        self.__image_screen.inner_rect,
+                    )
+            else:
+                painter.drawPixmap(self.rect(), self.__pixmap, QRectF(self.__pixmap.rect()))
 
     def resizeEvent(self, event: QGraphicsSceneResizeEvent):
         super().resizeEvent(event)
         if self.size() != self.__image_screen.bounds:
-            self.__image_screen = self.__image_file_manager.get_image_screen(self.__screen_idx, self.size())
-            self.__qimage = self.__image_screen.get_outer_qimage()
+            try:
+                self.__image_screen = self.__image_file_manager.get_image_screen(self.__screen_idx, self.size())
+                self.__set_qimage(self.__image_screen.get_outer_qimage())
+            except ImagesPending:
+                pass
 
     def set_transition(self, transition: "Transition | None"):
         if self.__transition:
@@ -60,3 +86,7 @@ class ImageScreenWidget(QGraphicsWidget):
         if transition:
             transition.setParent(self)
         self.__transition = transition
+
+    def __set_qimage(self, qimage: QImage):
+        self.__qimage = qimage
+        self.__pixmap = QPixmap.fromImage(qimage)
@@ -1,13 +1,18 @@
 from typing import TYPE_CHECKING
 
-from PySide6.QtCore import Qt, Signal, Slot
-from PySide6.QtGui import QColor
-from PySide6.QtWidgets import QGraphicsScene, QGraphicsView, QWidget
+from PySide6.QtCore import QObject, QPointF, QRectF, QSize, Signal, Slot
+from PySide6.QtWidgets import QGraphicsScene
 
 from slida.config import Config
 from slida.debug import add_live_object, print_live_objects, remove_live_object
+from slida.qt.image_cache import print_cache_stats
 from slida.qt.image_screen_widget import ImageScreenWidget
-from slida.transitions import NOOP
+from slida.transitions import (
+    FALLBACK_TRANSITION_PAIRS,
+    NOOP,
+    filter_transition_pairs,
+)
+from slida.transitions.quality import transition_quality
 
 
 if TYPE_CHECKING:
@@ -15,24 +20,32 @@ if TYPE_CHECKING:
     from slida.transitions import TransitionPair
 
 
-class ImageView(QGraphicsView):
+class ImageView(QObject):
+    """
+    Keeps the ImageScreenWidgets in the scene of the ApplicationView, and runs
+    the transitions between them. Everything is rendered by that one view,
+    which is also expected to call `on_frame_painted()` after every paint.
+    """
     __current_widget: ImageScreenWidget | None = None
     __image_file_manager: "ImageFileManager"
     __is_transitioning: bool = False
     __next_widget: ImageScreenWidget | None = None
+    # Transition pair name, screen size and quality level of the running
+    # transition, for reporting frame times to `transition_quality`:
+    __quality_key: tuple[str, QSize, int] | None = None
+    __quality_frames: int = 0
+    __scene: QGraphicsScene
+    __size: QSize
+    __transition_pair: "TransitionPair | None" = None
 
     transition_finished = Signal()
 
-    def __init__(self, image_file_manager: "ImageFileManager", parent: QWidget | None = None):
+    def __init__(self, image_file_manager: "ImageFileManager", scene: QGraphicsScene, parent: QObject | None = None):
         super().__init__(parent)
 
         self.__image_file_manager = image_file_manager
-        scene = QGraphicsScene(self)
-
-        self.setScene(scene)
-        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.setBackgroundBrush(QColor.fromString(Config.current().background.value))
+        self.__scene = scene
+        self.__size = QSize()
 
         add_live_object(id(self), self.__class__.__name__)
 
@@ -40,6 +53,11 @@ class ImageView(QGraphicsView):
     def is_transitioning(self):
         return self.__is_transitioning
 
+    @property
+    def transition_pair(self) -> "TransitionPair | None":
+        """The currently running transition pair, if any."""
+        return self.__transition_pair
+
     def deleteLater(self):
         super().deleteLater()
         remove_live_object(id(self))
@@ -54,26 +72,34 @@ class ImageView(QGraphicsView):
         old_current = self.__current_widget
         self.__current_widget = self.__next_widget
         self.__is_transitioning = False
+        self.__quality_key = None
+        self.__transition_pair = None
 
         if old_current:
-            self.scene().removeItem(old_current)
+            self.__scene.removeItem(old_current)
             old_current.deleteLater()
             self.__next_widget = None
 
         self.transition_finished.emit()
-        # Forward caching:
-        self.__image_file_manager.get_image_screen(screen_idx + 1, self.size().toSizeF())
+        self.__image_file_manager.prefetch(screen_idx, self.__size.toSizeF())
 
-    def resizeEvent(self, event):
-        viewport_rect = self.viewport().rect()
-        geometry = self.geometry()
+    def on_frame_painted(self, frame_time: float):
+        """`frame_time` is in milliseconds."""
+        if self.__quality_key is not None:
+            # The first frame is skipped, since that's where transitions do
+            # their one-time setup work:
+            if self.__quality_frames:
+                transition_quality.record_frame(*self.__quality_key, frame_time)
+            self.__quality_frames += 1
+
+    def resize(self, size: QSize):
+        self.__size = QSize(size)
+        geometry = QRectF(QPointF(0, 0), size.toSizeF())
 
-        self.scene().setSceneRect(viewport_rect)
         if self.__current_widget:
             self.__current_widget.setGeometry(geometry)
         if self.__next_widget:
             self.__next_widget.setGeometry(geometry)
-        super().resizeEvent(event)
 
     def transition_to(
         self,
@@ -84,6 +110,21 @@ class ImageView(QGraphicsView):
         if self.__is_transitioning:
             return
 
+        quality_level: int | None = 0
+        if transition_pair_type is not None:
+            quality_level = transition_quality.get_quality_level(transition_pair_type, self.__size)
+            if quality_level is None:
+                fallback = transition_quality.get_fallback(
+                    [p for p in filter_transition_pairs(FALLBACK_TRANSITION_PAIRS) if p is not transition_pair_type],
+                    self.__size,
+                )
+                if Config.current().debug.value:
+                    print(
+                        f"{transition_pair_type.name} is too slow for this screen size, "
+                        f"using {fallback[0].name if fallback else 'no transition'} instead"
+                    )
+                transition_pair_type, quality_level = fallback or (None, 0)
+
         if transition_pair_type is None:
             transition_pair_type = NOOP
             transition_duration = 0.0
@@ -91,9 +132,9 @@ class ImageView(QGraphicsView):
         self.__next_widget = ImageScreenWidget(
             image_file_manager=self.__image_file_manager,
             screen_idx=screen_idx,
-            size=self.size().toSizeF(),
+            size=self.__size.toSizeF(),
         )
-        self.scene().addItem(self.__next_widget)
+        self.__scene.addItem(self.__next_widget)
 
         if self.__current_widget and self.__current_widget.isActive():
             self.__next_widget.stackBefore(self.__current_widget)
@@ -105,19 +146,27 @@ class ImageView(QGraphicsView):
             duration=int(transition_duration * 1000),
         )
 
+        transition_pair.set_quality_level(quality_level)
+
         if Config.current().debug.value:
             print(
                 f"enter_class={transition_pair.enter_class.__name__}, "
-                f"exit_class={transition_pair.exit_class.__name__}"
+                f"exit_class={transition_pair.exit_class.__name__}, "
+                f"quality_level={quality_level}"
             )
             if screen_idx % 10 == 0:
                 print_live_objects()
+                print_cache_stats()
 
         self.__next_widget.set_transition(transition_pair.enter)
         if self.__current_widget:
             self.__current_widget.set_transition(transition_pair.exit)
 
         self.__is_transitioning = True
+        self.__transition_pair = transition_pair
+        if transition_pair_type is not NOOP:
+            self.__quality_key = transition_pair_type.name, QSize(self.__size), quality_level
+            self.__quality_frames = 0
 
         transition_pair.animation_group.finished.connect(lambda: self.on_transition_finished(screen_idx))
         transition_pair.animation_group.start()
@@ -0,0 +1,111 @@
+import threading
+
+from PySide6.QtCore import QRunnable, QThreadPool
+
+from slida.config import Config
+from slida.qt.image_screen import ImageScreen
+
+
+class ComposeJob(QRunnable):
+    cancelled: bool = False
+
+    def __init__(self, loader: "ScreenLoader", screen_idx: int, image_screen: ImageScreen):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.loader = loader
+        self.screen_idx = screen_idx
+        self.image_screen = image_screen
+
+    def run(self):
+        if not self.cancelled:
+            if Config.current().debug.value:
+                print(f"ComposeJob.run (screen_idx={self.screen_idx})")
+            self.image_screen.get_outer_qimage()
+        self.loader.on_job_done(self)
+
+
+class ScreenLoader:
+    """
+    Decodes and composes ImageScreens on a thread pool, before they are shown.
+
+    Jobs are prioritized by their distance from the current position (i.e.
+    the screen index currently being shown). Screens that fall outside of
+    the window around the current position are discarded, and their jobs
+    cancelled if they haven't started yet.
+    """
+    __jobs: dict[int, ComposeJob]
+    __lock: threading.Lock
+    __pool: QThreadPool
+    __position: int = 0
+    __screens: dict[int, ImageScreen]
+    # Keeps Python references to jobs until they are done or taken off the
+    # queue, so they aren't garbage collected while the pool holds them:
+    __unfinished: set[ComposeJob]
+
+    behind: int = 1
+
+    def __init__(self, ahead: int):
+        self.ahead = ahead
+        self.__jobs = {}
+        self.__lock = threading.Lock()
+        self.__pool = QThreadPool()
+        self.__screens = {}
+        self.__unfinished = set()
+
+    def get(self, screen_idx: int, image_screen: ImageScreen) -> ImageScreen:
+        """
+        If there is an equivalent ImageScreen for `screen_idx` that is composed
+        or being composed, return that one. Otherwise register `image_screen`
+        as the current one for that index and return it.
+        """
+        with self.__lock:
+            existing = self.__screens.get(screen_idx)
+            if existing is not None and existing == image_screen:
+                return existing
+            self.__discard(screen_idx)
+            self.__screens[screen_idx] = image_screen
+            return image_screen
+
+    def on_job_done(self, job: ComposeJob):
+        with self.__lock:
+            self.__unfinished.discard(job)
+            if self.__jobs.get(job.screen_idx) is job:
+                del self.__jobs[job.screen_idx]
+
+    def schedule(self, screen_idx: int):
+        with self.__lock:
+            image_screen = self.__screens.get(screen_idx)
+            if image_screen is None or image_screen.is_composed or screen_idx in self.__jobs:
+                return
+            job = ComposeJob(self, screen_idx, image_screen)
+            self.__jobs[screen_idx] = job
+            self.__unfinished.add(job)
+        self.__pool.start(job, self.__get_priority(screen_idx))
+
+    def set_position(self, screen_idx: int):
+        with self.__lock:
+            self.__position = screen_idx
+            for idx in list(self.__screens):
+                if idx < screen_idx - self.behind or idx > screen_idx + self.ahead:
+                    self.__discard(idx)
+            # Requeue the jobs that are still waiting, with new priorities:
+            for idx, job in self.__jobs.items():
+                if self.__pool.tryTake(job):
+                    self.__pool.start(job, self.__get_priority(idx))
+
+    def stop(self):
+        with self.__lock:
+            for idx in list(self.__screens):
+                self.__discard(idx)
+        self.__pool.waitForDone()
+
+    def __discard(self, screen_idx: int):
+        job = self.__jobs.pop(screen_idx, None)
+        if job:
+            job.cancelled = True
+            if self.__pool.tryTake(job):
+                self.__unfinished.discard(job)
+        self.__screens.pop(screen_idx, None)
+
+    def __get_priority(self, screen_idx: int) -> int:
+        return -abs(screen_idx - self.__position)
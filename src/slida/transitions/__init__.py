@@ -1,7 +1,8 @@
+from slida.config import Config
 from slida.transitions.base import Transition
-from slida.transitions.blur_effect import BlurDecrease, BlurIncrease
+from slida.transitions.blur import BlurDecrease, BlurIncrease
 from slida.transitions.flip import FlipXIn, FlipXOut, FlipYIn, FlipYOut
-from slida.transitions.opacity_effect import (
+from slida.transitions.mask import (
     BlindsOut,
     ClockfaceOut,
     ExplodeIn,
@@ -70,4 +71,37 @@ TRANSITION_PAIR_MAP: dict[str, type[TransitionPair]] = {
     pair.name: pair for pair in TRANSITION_PAIRS
 }
 
-__all__ = ["NOOP", "TRANSITION_PAIRS", "TRANSITION_PAIR_MAP", "TransitionPair", "Transition"]
+# Cheap pairs to use instead, in this order, when a transition is too slow
+# even at its lowest quality level (see slida.transitions.quality):
+FALLBACK_TRANSITION_PAIRS: list[type[TransitionPair]] = [
+    TRANSITION_PAIR_MAP["fade"],
+    TRANSITION_PAIR_MAP["slide-left"],
+]
+
+
+def filter_transition_pairs(pairs: list[type[TransitionPair]]) -> list[type[TransitionPair]]:
+    """Returns those of `pairs` that the `transitions` setting allows."""
+    config = Config.current()
+
+    if config.transitions.value is not None:
+        names = {p.name for p in pairs}
+        include = set(name.replace("_", "-") for name in config.transitions.value.get("include", names))
+        exclude = set(name.replace("_", "-") for name in config.transitions.value.get("exclude", []))
+
+        if "all" not in include:
+            names &= include
+            names -= exclude
+            pairs = [p for p in pairs if p.name in names]
+
+    return pairs
+
+
+__all__ = [
+    "FALLBACK_TRANSITION_PAIRS",
+    "NOOP",
+    "TRANSITION_PAIRS",
+    "TRANSITION_PAIR_MAP",
+    "TransitionPair",
+    "Transition",
+    "filter_transition_pairs",
+]
@@ -10,10 +10,16 @@ from PySide6.QtCore import (
     Signal,
     Slot,
 )
-from PySide6.QtGui import QImage, QPainter
+from PySide6.QtGui import QImage, QPainter, QPixmap, QRegion
 from PySide6.QtWidgets import QGraphicsEffect, QGraphicsWidget
 
-from slida.debug import add_live_object, remove_live_object
+from slida.debug import (
+    add_live_object,
+    finish_transition_run,
+    measure,
+    remove_live_object,
+    start_transition_run,
+)
 
 
 _ET = TypeVar("_ET", bound=QGraphicsEffect)
@@ -29,6 +35,11 @@ class Transition(QObject):
     no_borders: bool = False
     parent_z: float | None = None
     property_name: str | None = None
+    # How many levels of reduced quality (i.e. cheaper painting) above 0 the
+    # transition supports; see slida.transitions.quality. `quality_level` is
+    # set before the animation starts.
+    quality_level: int = 0
+    quality_levels: int = 0
     start_value: float = 0.0
     _progress: float
 
@@ -47,6 +58,11 @@ class Transition(QObject):
 
         self.animation = self.create_animation(duration)
 
+    @property
+    def stats_key(self) -> str:
+        """Key for this transition in slida.debug.transition_stats."""
+        return f"{self.name}/{self.__class__.__name__}"
+
     @Property(float) # type: ignore
     def progress(self): # type: ignore
         return self._progress
@@ -60,7 +76,8 @@ class Transition(QObject):
 
             if self.parent_z:
                 self.parent().setVisible(True)
-            self.on_progress(normalized)
+            with measure(self.stats_key, "on_progress"):
+                self.on_progress(normalized)
             if self.property_name:
                 self.parent().setProperty(self.property_name, normalized)
 
@@ -108,8 +125,29 @@ class Transition(QObject):
     def on_progress(self, value: float):
         ...
 
-    def paint(self, painter: QPainter, image: QImage, image_rect: QRectF):
-        painter.drawImage(self.parent().rect(), image)
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
+        """
+        `image` and `pixmap` have the same contents. Draw `pixmap` when just
+        drawing (parts of) the screen as-is, since it is already in the paint
+        device's native format; `image` is for when the pixels are needed.
+        """
+        painter.drawPixmap(self.parent().rect(), pixmap, QRectF(pixmap.rect()))
+
+    def update_parent(self, region: QRegion | None = None):
+        """
+        Schedules a repaint of `region` (in parent coordinates), or of the
+        whole parent if None. The rects are handed to the scene one by one,
+        since QGraphicsItem.update() would merge them into their bounding
+        rect.
+        """
+        parent = self.parent()
+        scene = parent.scene()
+
+        if region is None or scene is None:
+            parent.update(parent.rect())
+        else:
+            for rect in region:
+                scene.update(parent.mapRectToScene(QRectF(rect)))
 
     def parent(self) -> QGraphicsWidget:
         parent = super().parent()
@@ -129,9 +167,11 @@ class Transition(QObject):
     @Slot(QAbstractAnimation.State, QAbstractAnimation.State)
     def __on_animation_state_changed(self, new_state: QAbstractAnimation.State, old_state: QAbstractAnimation.State):
         if new_state == QAbstractAnimation.State.Running and old_state != new_state:
+            start_transition_run(id(self), self.stats_key)
             self.started.emit()
             self.on_animation_start()
         elif new_state == QAbstractAnimation.State.Stopped and old_state != new_state:
+            finish_transition_run(id(self), self.stats_key, self.animation.duration())
             try:
                 self.finished.emit()
                 self.on_animation_finish()
@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+from PySide6.QtCore import QEasingCurve, QRectF, Qt
+from PySide6.QtGui import QImage, QPainter, QPixmap
+
+from slida.transitions.base import Transition
+
+
+class BlurTransition(Transition):
+    """
+    Progress is the blur radius, as in QGraphicsBlurEffect. Instead of
+    blurring the full resolution image on every frame, a pyramid of
+    successively halved and slightly blurred versions of it is built once;
+    scaled back up, level n (n > 0) looks about the same as a
+    QGraphicsBlurEffect radius of 4 * 2^(n - 1). Radii in between levels are
+    drawn by crossfading the two nearest ones, except on lower quality
+    levels, where only the nearest level is drawn (and, on level 2, without
+    smooth scaling).
+    """
+    __pyramid: list[QImage]
+    __pyramid_key: int | None = None
+
+    pyramid_levels: int = 7
+    quality_levels = 2
+
+    def __init__(self, name, parent, duration):
+        self.__pyramid = []
+        super().__init__(name, parent, duration)
+
+    def cleanup(self):
+        super().cleanup()
+        self.parent().setOpacity(1.0)
+        self.__pyramid = []
+        self.__pyramid_key = None
+
+    def get_level(self, radius: float) -> float:
+        radius /= 4
+        if radius <= 1.0:
+            return max(radius, 0.0)
+        return min(1 + math.log2(radius), self.pyramid_levels - 1)
+
+    def get_pyramid(self, image: QImage) -> list[QImage]:
+        """Level 0 is `image` itself."""
+        if self.__pyramid_key != image.cacheKey():
+            level = image
+            if level.depth() != 32:
+                level = level.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+            self.__pyramid = [level]
+            while len(self.__pyramid) < self.pyramid_levels and level.width() > 1 and level.height() > 1:
+                level = level.scaled(
+                    level.width() // 2,
+                    level.height() // 2,
+                    Qt.AspectRatioMode.IgnoreAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+                # Without some extra blurring, the smaller levels would look
+                # blocky when scaled up:
+                if len(self.__pyramid) > 1:
+                    level = self.__blur(level)
+                self.__pyramid.append(level)
+            self.__pyramid_key = image.cacheKey()
+        return self.__pyramid
+
+    def on_progress(self, value: float):
+        super().on_progress(value)
+        self.parent().setOpacity(1 - (value / 100))
+        self.update_parent()
+
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
+        if image.width() <= 0:
+            return
+
+        pyramid = self.get_pyramid(image)
+        level = min(self.get_level(self._progress), len(pyramid) - 1)
+        if self.quality_level > 0:
+            level = round(level)
+        lower = math.floor(level)
+        target = QRectF(self.parent().rect())
+        opacity = painter.opacity()
+
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, self.quality_level < 2)
+        painter.drawImage(target, pyramid[lower])
+        if level > lower:
+            painter.setOpacity(opacity * (level - lower))
+            painter.drawImage(target, pyramid[lower + 1])
+            painter.setOpacity(opacity)
+
+    def __blur(self, image: QImage) -> QImage:
+        # [1, 2, 1] kernel in both directions, with edges repeated. Works on
+        # any 32 bit format, as long as alpha (if any) is premultiplied:
+        width, height = image.width(), image.height()
+        pixels = np.frombuffer(image.constBits(), dtype=np.uint8).reshape(height, image.bytesPerLine())
+        pixels = pixels[:, :width * 4].reshape(height, width, 4).astype(np.uint16)
+        pixels = np.pad(pixels, ((1, 1), (1, 1), (0, 0)), mode="edge")
+        pixels = pixels[:-2] + 2 * pixels[1:-1] + pixels[2:]
+        pixels = pixels[:, :-2] + 2 * pixels[:, 1:-1] + pixels[:, 2:]
+        blurred = np.ascontiguousarray(((pixels + 8) >> 4).astype(np.uint8))
+
+        return QImage(blurred.data, width, height, width * 4, image.format()).copy()
+
+
+class BlurDecrease(BlurTransition):
+    easing = QEasingCurve.Type.InBounce
+    end_value = -10.0
+    start_value = 100.0
+
+
+class BlurIncrease(BlurTransition):
+    easing = QEasingCurve.Type.InCubic
+    end_value = 100.0
@@ -0,0 +1,339 @@
+import dataclasses
+import itertools
+import math
+import random
+from abc import abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+from klaatu_python.utils import coerce_between
+from PySide6.QtCore import QEasingCurve, QPointF, QRect, QRectF, QSize
+from PySide6.QtGui import QColor, QImage, QPainter, QPixmap, QRegion
+
+from slida.config.base import Config
+from slida.transitions.base import Transition
+
+
+@dataclasses.dataclass
+class Mask:
+    alpha: np.ndarray
+    # Premultiplied copy of `alpha`, which QPainter composites a lot faster
+    # than Format_Alpha8:
+    qimage: QImage
+    # Rectangles in image coordinates, and the opacity to draw them with; None
+    # means they have to be composited with the mask. Fully transparent parts
+    # are left out.
+    spans: list[tuple[QRect, float | None]]
+
+
+class MaskTransition(Transition):
+    """
+    Shows the image through an alpha mask, which is defined the way a
+    QGradient would be: `get_gradient_positions()` returns the gradient
+    position of every pixel, and `get_stops()` the (position, alpha) stops
+    for a given progress value. Alpha is interpolated linearly between stops
+    and padded outside of them, like in Qt.
+
+    Gradient positions are only computed once per size. Masks are computed
+    from them with numpy at 1/`mask_scale` of the full resolution, and cached
+    per quantized progress step. Since compositing is what costs, each mask
+    is also split into spans: parts where the mask is opaque (or, for masks
+    that only vary horizontally, has the same alpha all the way down) are
+    just drawn, transparent parts are skipped, and only the rest is
+    composited with QPainter's DestinationIn mode. The spans are also used
+    to only repaint what may have changed since the previous step, i.e.
+    everything that is visible in either step, except what is opaque in
+    both.
+    """
+    __frame: QImage | None = None
+    __last_mask: Mask | None = None
+    __mask_size: QSize | None = None
+    __masks: "OrderedDict[int, Mask]"
+    __positions: np.ndarray | None = None
+    __step: int | None = None
+
+    mask_cache_size: int = 16
+    # Doubled for every quality level:
+    mask_scale: int = 2
+    progress_steps: int = 500
+    quality_levels = 2
+    # Width and height of the squares that masks are split into, in pixels:
+    tile_size: int = 64
+
+    def __init__(self, name, parent, duration):
+        self.__masks = OrderedDict()
+        super().__init__(name, parent, duration)
+
+    @abstractmethod
+    def get_gradient_positions(self, x: np.ndarray, y: np.ndarray, size: QSize) -> np.ndarray:
+        """
+        `x` and `y` are pixel center coordinates at full resolution, shaped
+        (1, width) and (height, 1) respectively. Should return an array that
+        is broadcastable to (height, width); a shape of (1, width) is kept as
+        is and stretched vertically.
+        """
+        ...
+
+    def get_bg_pos(self, progress: float) -> float:
+        return progress
+
+    def get_mask(self, size: QSize, progress: float) -> Mask:
+        if self.__positions is None or self.__mask_size != size:
+            scale = self.__get_mask_scale()
+            mask_width = math.ceil(size.width() / scale)
+            mask_height = math.ceil(size.height() / scale)
+            x = ((np.arange(mask_width, dtype=np.float32) + 0.5) * scale)[np.newaxis, :]
+            y = ((np.arange(mask_height, dtype=np.float32) + 0.5) * scale)[:, np.newaxis]
+            positions = np.asarray(self.get_gradient_positions(x, y, size), dtype=np.float32)
+            if positions.shape[0] != 1:
+                positions = np.broadcast_to(positions, (mask_height, mask_width))
+            self.__positions = np.ascontiguousarray(positions)
+            self.__mask_size = QSize(size)
+            self.__masks.clear()
+
+        step = round(progress * self.progress_steps)
+        mask = self.__masks.get(step)
+
+        if mask is None:
+            alpha = self.__get_alpha(self.__positions, self.get_stops(step / self.progress_steps))
+            height, width = alpha.shape
+            mask = Mask(
+                alpha=alpha,
+                qimage=QImage(alpha.data, width, height, alpha.strides[0], QImage.Format.Format_Alpha8)
+                .convertToFormat(QImage.Format.Format_ARGB32_Premultiplied),
+                spans=self.__get_spans(alpha, size),
+            )
+            self.__masks[step] = mask
+            if len(self.__masks) > self.mask_cache_size:
+                self.__masks.popitem(last=False)
+        else:
+            self.__masks.move_to_end(step)
+
+        return mask
+
+    def get_stops(self, progress: float) -> list[tuple[float, float]]:
+        """
+        Like QGradient.setColorAt(), positions outside of 0.0 - 1.0 are
+        ignored. Only the alpha of the background colour matters here.
+        """
+        stops: dict[float, float] = {}
+        transparent_pos = self.get_transparent_pos(progress)
+        bg_pos = self.get_bg_pos(progress)
+
+        if 0.0 <= transparent_pos <= 1.0:
+            stops[transparent_pos] = 0.0
+        if 0.0 <= bg_pos <= 1.0:
+            stops[bg_pos] = QColor.fromString(Config.current().background.value).alphaF()
+
+        return sorted(stops.items())
+
+    def get_transparent_pos(self, progress: float) -> float:
+        return progress
+
+    def on_progress(self, value: float):
+        super().on_progress(value)
+        step = round(value * self.progress_steps)
+        if step != self.__step:
+            self.__step = step
+            size = self.parent().size().toSize()
+            if size.isEmpty():
+                return
+
+            mask = self.get_mask(size, value)
+            if self.__last_mask is None:
+                self.update_parent()
+            else:
+                visible, opaque = self.__get_span_regions(mask)
+                last_visible, last_opaque = self.__get_span_regions(self.__last_mask)
+                self.update_parent(visible.united(last_visible).subtracted(opaque.intersected(last_opaque)))
+            self.__last_mask = mask
+
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
+        mask = self.get_mask(image.size(), self._progress)
+        composited = [rect for rect, opacity in mask.spans if opacity is None]
+        scale = self.__get_mask_scale()
+
+        if composited:
+            if self.__frame is None or self.__frame.size() != image.size():
+                self.__frame = QImage(image.size(), QImage.Format.Format_ARGB32_Premultiplied)
+            frame_painter = QPainter(self.__frame)
+            frame_painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            for rect in composited:
+                frame_painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+                frame_painter.drawImage(rect, image, rect)
+                frame_painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_DestinationIn)
+                frame_painter.drawImage(
+                    QRectF(rect),
+                    mask.qimage,
+                    QRectF(rect.x() / scale, rect.y() / scale, rect.width() / scale, rect.height() / scale),
+                )
+            frame_painter.end()
+
+        opacity = painter.opacity()
+        for rect, span_opacity in mask.spans:
+            if span_opacity is None:
+                painter.setOpacity(opacity)
+                painter.drawImage(rect, self.__frame, rect)
+            else:
+                painter.setOpacity(opacity * span_opacity)
+                painter.drawPixmap(rect, pixmap, rect)
+        painter.setOpacity(opacity)
+
+    def __get_alpha(self, positions: np.ndarray, stops: list[tuple[float, float]]) -> np.ndarray:
+        if not stops:
+            # Same as Qt, which defaults to black at 0.0 and white at 1.0:
+            return np.full(positions.shape, 255, dtype=np.uint8)
+
+        if len(stops) == 1 or (len(stops) == 2 and stops[0][1] == stops[1][1]):
+            return np.full(positions.shape, round(stops[0][1] * 255), dtype=np.uint8)
+
+        if len(stops) == 2:
+            (start_pos, start_alpha), (end_pos, end_alpha) = stops
+            values = positions - np.float32(start_pos)
+            values *= np.float32((end_alpha - start_alpha) * 255 / (end_pos - start_pos))
+            values += np.float32(start_alpha * 255)
+            # Adding 0.5 and truncating rounds just as well as np.rint(), at
+            # half the cost:
+            values += np.float32(0.5)
+            np.clip(values, min(start_alpha, end_alpha) * 255, max(start_alpha, end_alpha) * 255 + 0.5, out=values)
+            return values.astype(np.uint8)
+
+        xp, fp = zip(*stops)
+        return np.rint(np.interp(positions, xp, np.array(fp) * 255)).astype(np.uint8)
+
+    def __get_mask_scale(self) -> int:
+        return self.mask_scale * 2 ** self.quality_level
+
+    def __get_span_regions(self, mask: Mask) -> tuple[QRegion, QRegion]:
+        """Returns (all spans, opaque spans)."""
+        visible, opaque = QRegion(), QRegion()
+        for rect, opacity in mask.spans:
+            visible += rect
+            if opacity == 1.0:
+                opaque += rect
+        return visible, opaque
+
+    def __get_spans(self, alpha: np.ndarray, size: QSize) -> list[tuple[QRect, float | None]]:
+        min_alpha, max_alpha = int(alpha.min()), int(alpha.max())
+
+        if max_alpha == 0:
+            return []
+        if min_alpha == 255:
+            return [(QRect(0, 0, size.width(), size.height()), 1.0)]
+
+        if alpha.shape[0] == 1:
+            # Only varies horizontally, so every run of columns with the same
+            # alpha can just be drawn with that opacity:
+            row = alpha[0]
+            edges = [0] + (np.flatnonzero(np.diff(row)) + 1).tolist() + [len(row)]
+            return [
+                (QRect(left, 0, right - left, size.height()), int(row[left]) / 255)
+                for left, right in itertools.pairwise(edges)
+                if row[left]
+            ]
+
+        scale = self.__get_mask_scale()
+        tile = max(self.tile_size // scale, 1)
+        rows, columns = -(-alpha.shape[0] // tile), -(-alpha.shape[1] // tile)
+        # Padding with edge values doesn't change any minimums or maximums,
+        # and lets the tiles be reduced as reshaped views:
+        padded = np.pad(alpha, ((0, rows * tile - alpha.shape[0]), (0, columns * tile - alpha.shape[1])), mode="edge")
+        mins = padded.reshape(rows, tile, -1).min(axis=1).reshape(rows, columns, tile).min(axis=2)
+        maxs = padded.reshape(rows, tile, -1).max(axis=1).reshape(rows, columns, tile).max(axis=2)
+        # 0 = transparent, 1 = opaque, 2 = needs compositing:
+        kinds = np.where(maxs == 0, 0, np.where(mins == 255, 1, 2))
+        x_edges = [min(x * tile * scale, size.width()) for x in range(columns + 1)]
+        y_edges = [min(y * tile * scale, size.height()) for y in range(rows + 1)]
+        spans: list[tuple[QRect, float | None]] = []
+
+        # Consecutive tiles of the same kind are merged into one span:
+        for tile_row, (top, bottom) in zip(kinds.tolist(), itertools.pairwise(y_edges)):
+            column = 0
+            for kind, tiles in itertools.groupby(tile_row):
+                count = len(list(tiles))
+                if kind:
+                    left, right = x_edges[column], x_edges[column + count]
+                    spans.append((QRect(left, top, right - left, bottom - top), 1.0 if kind == 1 else None))
+                column += count
+
+        return spans
+
+
+class ExplodeImplodeTransition(MaskTransition):
+    def get_gradient_positions(self, x, y, size):
+        # Distance from the center, as a fraction of the distance to a corner.
+        # - Vad är det som är vitt och kladdigt i matteboken?
+        # - Pythagoras sats.
+        center_x, center_y = size.width() / 2, size.height() / 2
+        return np.hypot(x - center_x, y - center_y) / math.sqrt(pow(center_x, 2) + pow(center_y, 2))
+
+    def get_stops(self, progress):
+        # The gradient radius is `progress` times the corner distance, so stop
+        # positions are scaled accordingly:
+        if progress <= 0.0:
+            return [(0.0, 0.0)]
+        return [(pos * progress, alpha) for pos, alpha in super().get_stops(progress)]
+
+    def get_transparent_pos(self, progress):
+        return progress + 0.01
+
+
+class BlindsOut(MaskTransition):
+    easing = QEasingCurve.Type.OutSine
+    end_value = 1.01
+    mask_scale = 1
+
+    def get_bg_pos(self, progress):
+        return progress + 0.01
+
+    def get_gradient_positions(self, x, y, size):
+        # Repeating linear gradient, 50 px wide:
+        return np.mod(x, 50) / 50
+
+    def get_transparent_pos(self, progress: float) -> float:
+        return coerce_between(progress, 0.0, 1.0)
+
+
+class ClockfaceOut(MaskTransition):
+    easing = QEasingCurve.Type.InOutSine
+
+    def get_bg_pos(self, progress):
+        return progress + 0.02
+
+    def get_gradient_positions(self, x, y, size):
+        # Conical gradient, counter-clockwise from 3 o'clock:
+        angles = np.arctan2(size.height() / 2 - y, x - size.width() / 2)
+        return np.mod(angles, 2 * math.pi) / (2 * math.pi)
+
+
+class ExplodeIn(ExplodeImplodeTransition):
+    easing = QEasingCurve.Type.OutExpo
+    parent_z = 1.0
+
+
+class ImplodeOut(ExplodeImplodeTransition):
+    easing = QEasingCurve.Type.OutBounce
+    end_value = 0.0
+    start_value = 1.0
+
+
+class RadialOut(MaskTransition):
+    easing = QEasingCurve.Type.OutCirc
+    end_value = 1.01
+    offset: tuple[float, float] = 0.0, 0.0
+
+    def __init__(self, name, parent, duration):
+        self.offset = random.random(), random.random()
+        super().__init__(name, parent, duration)
+
+    def get_bg_pos(self, progress):
+        return progress + 0.01
+
+    def get_gradient_positions(self, x, y, size):
+        # Radial gradient with a radius of 25 px and reflect spread:
+        center = QPointF(size.width() * self.offset[0], size.height() * self.offset[1])
+        positions = np.mod(np.hypot(x - center.x(), y - center.y()) / 25, 2)
+        return np.where(positions > 1, 2 - positions, positions)
+
+    def get_transparent_pos(self, progress: float) -> float:
+        return coerce_between(progress, 0.0, 1.0)
@@ -54,6 +54,11 @@ class TransitionPair(QObject):
         self.animation_group.deleteLater()
         super().deleteLater()
 
+    def set_quality_level(self, level: int):
+        for transition in (self.enter, self.exit):
+            if transition:
+                transition.quality_level = min(level, transition.quality_levels)
+
     @Slot(QAbstractAnimation.State, QAbstractAnimation.State)
     def on_animation_state_changed(self, new_state: QAbstractAnimation.State, old_state: QAbstractAnimation.State):
         if new_state == QAbstractAnimation.State.Running and old_state != new_state:
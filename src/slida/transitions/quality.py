@@ -0,0 +1,115 @@
+import statistics
+from collections import deque
+from typing import TYPE_CHECKING, Iterable
+
+from PySide6.QtCore import QSize
+
+from slida.config import Config
+
+
+if TYPE_CHECKING:
+    from slida.transitions.pair import TransitionPair
+
+
+class TransitionQuality:
+    """
+    Keeps the latest frame times for every transition pair, screen size and
+    quality level, and uses their median to decide which quality level the
+    next run of a pair should get. Level 0 is full quality; every level above
+    that makes a transition paint less for each frame (see
+    Transition.quality_levels).
+
+    The level chosen is the lowest one that has not (yet) been shown to
+    exceed the frame budget. Since the median only covers a window of the
+    latest frames, and isn't trusted until there are a few of them, the odd
+    slow frame can't demote a pair by itself. And since frame times vary
+    with whatever else is going on, a demoted pair gets to try the next
+    better level again every `reprobe_interval` runs. If every level a pair
+    supports exceeds the budget, get_quality_level() returns None, and
+    ImageView falls back to a cheaper pair (see get_fallback()), or to not
+    transitioning at all.
+
+    Only meant to be used from the GUI thread.
+    """
+    __frame_times: dict[tuple[str, int, int, int], deque[float]]
+    # Runs of each pair and screen size since it last tried a better level:
+    __runs: dict[tuple[str, int, int], int]
+
+    # Number of frames needed before the median is trusted:
+    min_frames: int = 5
+    reprobe_interval: int = 10
+    # Number of latest frames that the median is taken over:
+    window: int = 30
+
+    def __init__(self):
+        self.__frame_times = {}
+        self.__runs = {}
+
+    def get_average(self, pair_name: str, size: QSize, level: int) -> float | None:
+        frame_times = self.__frame_times.get((pair_name, size.width(), size.height(), level))
+        if frame_times is None or len(frame_times) < self.min_frames:
+            return None
+        return statistics.median(frame_times)
+
+    def get_fallback(
+        self,
+        pair_types: "Iterable[type[TransitionPair]]",
+        size: QSize,
+    ) -> "tuple[type[TransitionPair], int] | None":
+        """
+        Returns the first of `pair_types` that doesn't exceed the budget at
+        some quality level, along with that level. Unlike
+        get_quality_level(), this doesn't count as a run of any of them.
+        """
+        for pair_type in pair_types:
+            level = self.__get_lowest_level(pair_type, size)
+            if level is not None:
+                return pair_type, level
+        return None
+
+    def get_quality_level(self, pair_type: "type[TransitionPair]", size: QSize) -> int | None:
+        lowest_level = self.__get_lowest_level(pair_type, size)
+        max_level = self.__get_max_level(pair_type)
+        level = lowest_level if lowest_level is not None else max_level + 1
+
+        if level > 0:
+            runs_key = (pair_type.name, size.width(), size.height())
+            runs = self.__runs.get(runs_key, 0) + 1
+            if runs >= self.reprobe_interval:
+                # Measure the next better level from scratch:
+                runs = 0
+                level -= 1
+                self.__frame_times.pop((pair_type.name, size.width(), size.height(), level), None)
+            self.__runs[runs_key] = runs
+
+        return level if level <= max_level else None
+
+    def record_frame(self, pair_name: str, size: QSize, level: int, frame_time: float):
+        """`frame_time` is in milliseconds."""
+        key = (pair_name, size.width(), size.height(), level)
+        frame_times = self.__frame_times.get(key)
+        if frame_times is None:
+            frame_times = self.__frame_times[key] = deque(maxlen=self.window)
+        frame_times.append(frame_time)
+
+    def __get_lowest_level(self, pair_type: "type[TransitionPair]", size: QSize) -> int | None:
+        """
+        The lowest level that has not been shown to exceed the budget, if
+        any.
+        """
+        budget = Config.current().frame_budget.value
+        if budget <= 0:
+            return 0
+
+        for level in range(self.__get_max_level(pair_type) + 1):
+            average = self.get_average(pair_type.name, size, level)
+            if average is None or average <= budget:
+                return level
+
+        return None
+
+    def __get_max_level(self, pair_type: "type[TransitionPair]") -> int:
+        return max(pair_type.enter_class.quality_levels, pair_type.exit_class.quality_levels)
+
+
+transition_quality = TransitionQuality()
@@ -1,137 +1,148 @@
+import itertools
 import math
 from abc import abstractmethod
-from math import ceil, floor
 
 import numpy as np
 from klaatu_python.utils import coerce_between
-from PySide6.QtCore import QEasingCurve, QObject, QRect, QRectF, QSize
-from PySide6.QtGui import QImage, QPainter, QPixmap, qRgba
+from PySide6.QtCore import QEasingCurve, QRect, QRectF, QSize, Qt
+from PySide6.QtGui import QImage, QPainter, QPixmap, QRegion
 
-from slida.debug import add_live_object, remove_live_object
 from slida.qt.utils import get_subsquare_count
 from slida.transitions.base import Transition
 
 
-class SubImage(QObject):
-    column: int
-    filled: bool = False
-    row: int
-
-    def __init__(self, parent: QObject, row: int, column: int, filled: bool = False):
-        super().__init__(parent)
-        self.row = row
-        self.column = column
-        self.filled = filled
-        add_live_object(id(self), self.__class__.__name__)
-
-    def deleteLater(self):
-        remove_live_object(id(self))
-        super().deleteLater()
-
-    def toggle_filled(self):
-        self.filled = not self.filled
-
-
 class SubImageTransition(Transition):
-    __subs: list[list[SubImage]] | None = None
+    """
+    Reveals the image one grid cell at a time. Which cells are filled is kept
+    in a boolean numpy grid; on paint, only the cells that have flipped since
+    the previous paint are drawn (or cleared) on an accumulated layer, which
+    is then drawn in one go. Likewise, only those cells are marked for
+    repaint on progress.
+    """
+    __cell_rects: list[QRect] | None = None
+    __cell_rects_size: QSize | None = None
+    __filled: np.ndarray | None = None
+    __layer: QImage | None = None
+    __layer_filled: np.ndarray | None = None
+    __layer_source_key: int | None = None
     columns: int = 0
     parent_z = 1.0
+    quality_levels = 2
     rows: int = 0
+    # Doubled for every quality level:
     min_sub_width: int = 50
 
-    def deleteLater(self):
-        for subsubs in self.__subs or []:
-            for sub in subsubs:
-                sub.deleteLater()
-        super().deleteLater()
-
     @abstractmethod
     def fill_subs(self, size: QSize, progress: float):
         ...
 
-    def get_filled_subs(self, size: QSize) -> list[SubImage]:
-        return [s for s in self.get_subs_flattened(size) if s.filled]
-
-    def get_sub_geometry(self, size: QSize, sub: SubImage, offset: int = 0) -> QRect:
-        column = (sub.column + offset) % self.columns
-        row = sub.row + math.floor((sub.column + offset) / self.columns)
-        sub_width = size.width() / self.columns
-        sub_height = size.height() / self.rows
-        return QRect(floor(column * sub_width), floor(row * sub_height), ceil(sub_width), ceil(sub_height))
-
-    def get_subs(self, size: QSize) -> list[list[SubImage]]:
-        if self.__subs is None:
-            if size.width() > 0:
-                self.__subs = []
-                self.rows, self.columns = get_subsquare_count(size, self.min_sub_width)
-
-                for y in range(self.rows):
-                    y_subs: list[SubImage] = []
-                    for x in range(self.columns):
-                        y_subs.append(SubImage(parent=self, row=y, column=x))
-                    self.__subs.append(y_subs)
-
-        return self.__subs or []
-
-    def get_subs_flattened(self, size: QSize) -> list[SubImage]:
-        subs = self.get_subs(size)
-        return [s for subsubs in subs for s in subsubs]
+    def get_cell_rects(self, size: QSize) -> list[QRect]:
+        """
+        Cell rectangles in row-major order, tiling `size` exactly (i.e.
+        without gaps or overlaps).
+        """
+        if self.__cell_rects is None or self.__cell_rects_size != size:
+            self.get_filled(size)
+            self.__cell_rects_size = QSize(size)
+            xs = np.floor(np.linspace(0, size.width(), self.columns + 1)).astype(int)
+            ys = np.floor(np.linspace(0, size.height(), self.rows + 1)).astype(int)
+            self.__cell_rects = [
+                QRect(x0, y0, x1 - x0, y1 - y0)
+                for y0, y1 in itertools.pairwise(ys.tolist())
+                for x0, x1 in itertools.pairwise(xs.tolist())
+            ]
+        return self.__cell_rects
+
+    def get_filled(self, size: QSize) -> np.ndarray:
+        """Boolean grid of shape (rows, columns)."""
+        if self.__filled is None:
+            self.rows, self.columns = get_subsquare_count(size, self.min_sub_width * 2 ** self.quality_level)
+            self.__filled = np.zeros((self.rows, self.columns), dtype=np.bool_)
+        return self.__filled
 
     def on_progress(self, value: float):
         super().on_progress(value)
-        if self.__diff():
-            self.parent().update(self.parent().rect())
+        size = self.parent().size().toSize()
+        if size.isEmpty():
+            return
+
+        filled = self.get_filled(size).ravel()
+        filled_before = filled.copy()
+        self.fill_subs(size, value)
+        flipped = np.flatnonzero(filled != filled_before)
+
+        if flipped.size:
+            cell_rects = self.get_cell_rects(size)
+            region = QRegion()
+            for idx in flipped.tolist():
+                region += cell_rects[idx]
+            self.update_parent(region)
+
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
+        if image.width() <= 0:
+            return
 
-    def paint(self, painter: QPainter, image: QImage, image_rect: QRectF):
         self.fill_subs(image.size(), self._progress)
-        for sub in self.get_filled_subs(image.size()):
-            geometry = self.get_sub_geometry(image.size(), sub)
-            painter.drawImage(geometry, image.copy(geometry))
+        filled = self.get_filled(image.size()).ravel()
+        cell_rects = self.get_cell_rects(image.size())
+
+        if self.__layer is None or self.__layer_source_key != image.cacheKey():
+            self.__layer = QImage(image.size(), QImage.Format.Format_ARGB32_Premultiplied)
+            self.__layer.fill(Qt.GlobalColor.transparent)
+            self.__layer_filled = np.zeros_like(filled)
+            self.__layer_source_key = image.cacheKey()
+
+        assert self.__layer_filled is not None
+        flipped = np.flatnonzero(filled != self.__layer_filled)
 
-    def __diff(self) -> int:
-        if self.__subs:
-            filled_before = len([s for subsubs in self.__subs for s in subsubs if s.filled])
-            filled_after = round(self.rows * self.columns * self._progress)
-            return filled_after - filled_before
-        return 0
+        if flipped.size:
+            layer_painter = QPainter(self.__layer)
+            layer_painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+            for idx in flipped.tolist():
+                rect = cell_rects[idx]
+                if filled[idx]:
+                    layer_painter.drawImage(rect, image, rect)
+                else:
+                    layer_painter.fillRect(rect, Qt.GlobalColor.transparent)
+            layer_painter.end()
+            self.__layer_filled = filled.copy()
+
+        painter.drawImage(0, 0, self.__layer)
 
 
 class RandomSubImageTransition(SubImageTransition):
     end_value = 1.1
+    __fill_order: np.ndarray | None = None
+    __filled_count: int = 0
 
     def fill_subs(self, size: QSize, progress: float):
         progress = coerce_between(progress, 0.0, 1.0)
-        subs = self.get_subs_flattened(size)
+        filled = self.get_filled(size).ravel()
+        fill_order = self.get_fill_order()
+        filled_count = round(filled.size * progress)
 
-        if progress in (0.0, 1.0):
-            for sub in subs:
-                sub.filled = bool(progress)
-        else:
-            filled_subs = [s for s in subs if s.filled]
-            filled_before = len(filled_subs)
-            filled_after = round(len(subs) * progress)
-            diff = filled_after - filled_before
-
-            if diff != 0:
-                unfilled_subs = [s for s in subs if not s.filled]
-                weights = None
-                probabilities = None
-                subs = unfilled_subs if diff > 0 else filled_subs
-                weights = np.array([self.get_sub_image_weight(s) for s in subs])
-                if diff < 0:
-                    weights = 1 / weights
-                weight_sum = weights.sum()
-                probabilities = weights / weight_sum
-
-                try:
-                    for index in np.random.choice(range(len(subs)), size=abs(diff), replace=False, p=probabilities):
-                        subs[index].toggle_filled()
-                except Exception as e:
-                    print(e)
-                    print(probabilities)
-
-    def get_sub_image_weight(self, s: SubImage) -> float:
-        return 1.0
+        if filled_count > self.__filled_count:
+            filled[fill_order[self.__filled_count:filled_count]] = True
+        elif filled_count < self.__filled_count:
+            filled[fill_order[filled_count:self.__filled_count]] = False
+
+        self.__filled_count = filled_count
+
+    def get_fill_order(self) -> np.ndarray:
+        """
+        Flat cell indices in the order they are to be filled; a weighted random
+        permutation, made with the Gumbel-max trick: sorting log(weight) plus
+        Gumbel noise in descending order amounts to drawing cells one by one
+        without replacement, with probabilities proportional to their weights.
+        """
+        if self.__fill_order is None:
+            keys = np.log(self.get_sub_image_weights().ravel()) + np.random.gumbel(size=self.rows * self.columns)
+            self.__fill_order = np.argsort(-keys)
+        return self.__fill_order
+
+    def get_sub_image_weights(self) -> np.ndarray:
+        """Relative cell weights, as an array of shape (rows, columns)."""
+        return np.ones((self.rows, self.columns))
 
 
 class RandomSquaresIn(RandomSubImageTransition):
@@ -139,13 +150,16 @@ class RandomSquaresIn(RandomSubImageTransition):
 
 
 class TopLeftSquaresIn(RandomSubImageTransition):
-    def get_sub_image_weight(self, s: SubImage) -> float:
-        return pow(2, (self.rows + self.columns - s.row - s.column - 2) / (self.rows + self.columns - 2) * 50)
+    def get_sub_image_weights(self) -> np.ndarray:
+        rows, columns = np.indices((self.rows, self.columns))
+        max_distance = max(self.rows + self.columns - 2, 1)
+        return np.power(2.0, (self.rows + self.columns - rows - columns - 2) / max_distance * 50)
 
 
 class TopSquaresIn(RandomSubImageTransition):
-    def get_sub_image_weight(self, s: SubImage) -> float:
-        return pow(2, (self.rows - s.row - 1) / (self.rows - 1) * 50)
+    def get_sub_image_weights(self) -> np.ndarray:
+        rows, _ = np.indices((self.rows, self.columns))
+        return np.power(2.0, (self.rows - rows - 1) / max(self.rows - 1, 1) * 50)
 
 
 class SnakeTransition(Transition):
@@ -203,9 +217,9 @@ class SnakeTransition(Transition):
             self.__offset = self.progress_to_offset(value, self.__rows, self.__columns)
         if self.__offset is None or self.__offset != self.__last_offset:
             self.__last_offset = self.__offset
-            self.parent().update(self.parent().rect())
+            self.update_parent()
 
-    def paint(self, painter: QPainter, image: QImage, image_rect: QRectF):
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
         size = image_rect.size()
         rows, columns = get_subsquare_count(size, self.min_sub_width)
         self.__rows, self.__columns = rows, columns
@@ -219,7 +233,15 @@ class SnakeTransition(Transition):
                 translate_by = image_rect.topLeft()
                 painter_geo = self.index_to_geometry(rows, columns, painter_idx, sub_width, sub_height).translated(translate_by)
                 image_geo = self.index_to_geometry(rows, columns, image_idx, sub_width, sub_height).translated(translate_by)
-                painter.drawImage(painter_geo, image.copy(image_geo.toRect()).mirrored(bool(mirrored), False))
+                if mirrored:
+                    # Flip horizontally around the centre of painter_geo:
+                    painter.save()
+                    painter.translate(painter_geo.left() + painter_geo.right(), 0)
+                    painter.scale(-1, 1)
+                    painter.drawPixmap(painter_geo, pixmap, image_geo)
+                    painter.restore()
+                else:
+                    painter.drawPixmap(painter_geo, pixmap, image_geo)
 
     def progress_to_offset(self, progress: float, rows: int, columns: int):
         return round(rows * columns * progress)
@@ -241,54 +263,109 @@ class SnakeOut(SnakeTransition):
 
 
 class PixelateTransition(Transition):
+    """
+    The source image is turned into running column sums once (i.e. row `y`
+    of `__prefix` holds the sums of each column over the `y` rows above it).
+    For every block size, the block sums then only take one subtraction per
+    block row plus one pass over those rows, rather than a pass over the
+    whole image. The block means are painted as a tiny image with one pixel
+    per block, cached per block size and scaled up without smoothing, so no
+    full size frame is ever built.
+    """
     max_sub_width = 100
+    quality_levels = 2
+    __levels: dict[int, QImage] | None = None
+    __prefix: np.ndarray | None = None
+    __source_key: int | None = None
     __sub_width: int | None = None
 
-    def get_sub_images(self, image: QImage, sub_width: int):
-        height_mod = image.height() % sub_width
-        heights = [sub_width] * int(image.height() / sub_width)
-        if height_mod:
-            heights = [math.ceil(height_mod / 2)] + heights + [math.floor(height_mod / 2)]
-            heights = [h for h in heights if h > 0]
-
-        width_mod = image.width() % sub_width
-        widths = [sub_width] * int(image.width() / sub_width)
-        if width_mod:
-            widths = [math.ceil(width_mod / 2)] + widths + [math.floor(width_mod / 2)]
-            widths = [w for w in widths if w > 0]
-
-        y = 0
-
-        for h in heights:
-            x = 0
-            for w in widths:
-                rect = QRect(x, y, w, h)
-                sub = image.copy(rect).convertToFormat(QImage.Format.Format_RGBA8888)
-                rgba_arr = np.mean(np.array(sub.constBits()).reshape((-1, 4)), axis=0, dtype=np.int_)
-
-                assert isinstance(rgba_arr, np.ndarray)
-
-                rgba = qRgba(rgba_arr[0], rgba_arr[1], rgba_arr[2], rgba_arr[3])
-                pixmap = QPixmap(w, h)
-                pixmap.fill(rgba)
-
-                yield pixmap, rect
-                x += w
-            y += h
+    def get_block_sizes(self, length: int, sub_width: int) -> list[int]:
+        """Full blocks, with any remainder split between the two ends."""
+        mod = length % sub_width
+        sizes = [sub_width] * int(length / sub_width)
+        if mod:
+            sizes = [math.ceil(mod / 2)] + sizes + [math.floor(mod / 2)]
+            sizes = [s for s in sizes if s > 0]
+        return sizes
+
+    def get_means(self, image: QImage, sub_width: int) -> QImage:
+        """Returns an image with the mean colour of every block as a pixel."""
+        if self.__levels is None or self.__prefix is None or self.__source_key != image.cacheKey():
+            rgba = image.convertToFormat(QImage.Format.Format_RGBA8888)
+            bits = np.frombuffer(rgba.constBits(), dtype=np.uint8).reshape((rgba.height(), rgba.bytesPerLine()))
+            source = bits[:, :rgba.width() * 4].reshape((rgba.height(), rgba.width(), 4))
+            # Adding one row at a time (i.e. over contiguous memory) is a lot
+            # faster than np.cumsum() along axis 0. The sums may wrap around,
+            # but the differences between them, which is what gets used,
+            # don't:
+            self.__prefix = np.empty((rgba.height() + 1, rgba.width(), 4), dtype=np.uint32)
+            self.__prefix[0] = 0
+            for row in range(rgba.height()):
+                np.add(self.__prefix[row], source[row], out=self.__prefix[row + 1], dtype=np.uint32)
+            self.__source_key = image.cacheKey()
+            self.__levels = {}
+
+        means = self.__levels.get(sub_width)
+
+        if means is None:
+            heights = self.get_block_sizes(image.height(), sub_width)
+            widths = self.get_block_sizes(image.width(), sub_width)
+            row_sums = np.diff(self.__prefix[np.cumsum([0] + heights)], axis=0)
+            sums = np.add.reduceat(row_sums, np.cumsum([0] + widths[:-1]), axis=1, dtype=np.uint32)
+            pixels = np.ascontiguousarray(sums // np.outer(heights, widths)[..., np.newaxis], dtype=np.uint8)
+            # Converted to what is painted on right away, which makes scaling
+            # it up a lot faster. That also copies the buffer, which the
+            # QImage would otherwise not own:
+            means = QImage(
+                pixels.data,
+                len(widths),
+                len(heights),
+                len(widths) * 4,
+                QImage.Format.Format_RGBA8888,
+            ).convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+            self.__levels[sub_width] = means
+
+        return means
+
+    def on_animation_finish(self):
+        super().on_animation_finish()
+        # Only painted as-is from here on, and the prefix is big; as the
+        # halves of a pair run one after the other, this keeps them from
+        # holding one each at the same time:
+        self.__levels = None
+        self.__prefix = None
 
     def on_progress(self, value: float):
         super().on_progress(value)
-        sub_width = round(self.max_sub_width * value)
+        # On lower quality levels, only every 4th/16th block size is used, so
+        # fewer of them have to be computed:
+        step = 4 ** self.quality_level
+        sub_width = round(self.max_sub_width * value / step) * step
         if sub_width != self.__sub_width:
             self.__sub_width = sub_width
-            self.parent().update(self.parent().rect())
+            self.update_parent()
 
-    def paint(self, painter: QPainter, image: QImage, image_rect: QRectF):
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
         if self.__sub_width and self.__sub_width > 10:
-            for sub, rect in self.get_sub_images(image, min(self.__sub_width, image.width(), image.height())):
-                painter.drawPixmap(rect, sub)
+            sub_width = min(self.__sub_width, image.width(), image.height())
+            means = self.get_means(image, sub_width)
+            # The edge blocks may be narrower than the rest (see
+            # get_block_sizes()), so every block is drawn at full size, and
+            # the overflow is clipped:
+            left = self.__get_overflow(image.width(), sub_width)
+            top = self.__get_overflow(image.height(), sub_width)
+            painter.save()
+            painter.setClipRect(QRect(0, 0, image.width(), image.height()), Qt.ClipOperation.IntersectClip)
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+            painter.drawImage(QRect(-left, -top, means.width() * sub_width, means.height() * sub_width), means)
+            painter.restore()
         else:
-            painter.drawImage(self.parent().rect(), image)
+            super().paint(painter, image, pixmap, image_rect)
+
+    def __get_overflow(self, length: int, sub_width: int) -> int:
+        # How much of the first block lies outside the image:
+        mod = length % sub_width
+        return sub_width - math.ceil(mod / 2) if mod else 0
 
 
 class PixelateOut(PixelateTransition):
@@ -38,15 +38,13 @@ class FlashIn(Transition):
 
     def on_progress(self, value: float):
         super().on_progress(value)
-        self.parent().update(self.parent().rect())
+        self.update_parent()
 
-    def paint(self, painter: QPainter, image: QImage, image_rect: QRectF):
-        painter.drawImage(self.parent().rect(), image)
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
+        super().paint(painter, image, pixmap, image_rect)
 
         if self._progress:
-            overlay = QPixmap(self.parent().size().toSize())
-            overlay.fill(QColor(255, 255, 255, int(self._progress * 255)))
-            painter.drawPixmap(self.parent().rect().toRect(), overlay)
+            painter.fillRect(self.parent().rect(), QColor(255, 255, 255, int(self._progress * 255)))
 
 
 class Grow(ShrinkGrowTransition):
@@ -72,10 +70,10 @@ class TestIn(EffectTransition[TestEffect]):
     parent_z = 1.0
 
     def on_progress(self, value: float):
-        self.parent().update(self.parent().rect())
+        self.update_parent()
         self.parent().setVisible(True)
 
-    def paint(self, painter: QPainter, image: QImage, image_rect: QRectF):
+    def paint(self, painter: QPainter, image: QImage, pixmap: QPixmap, image_rect: QRectF):
         t = QTransform()
         left_rect = copy.copy(image_rect)
         left_rect.setRight(image_rect.right() / 2)
@@ -4,6 +4,10 @@ from typing import TypeVar
 _T = TypeVar("_T")
 
 
+class ImagesPending(Exception):
+    """Raised when a screen cannot be filled yet, but more images may come."""
+
+
 class NoImagesFound(Exception):
     ...
 
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from PySide6.QtCore import QSizeF
+from PySide6.QtGui import QColor, QImage
+from PySide6.QtWidgets import QApplication
+
+from slida.config import Config
+from slida.files.file_order import FileOrder
+from slida.files.manager import ImageFileManager
+
+
+BOUNDS = QSizeF(1920, 1080)
+
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        self.app = QApplication.instance() or QApplication([])
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.root = self.tempdir.name
+        for name in ["1.jpg", "2.jpg", "3.jpg", "4.jpg", "5.jpg", "6.jpg"]:
+            self.make_image(name)
+
+        config = Config.current()
+        config.order.value = FileOrder.NAME
+        config.scan_index.value = False
+        config.streaming.value = False
+        config.watch.value = True
+        self.manager = ImageFileManager(self.root)
+        # Don't wait for new files to settle:
+        self.manager.settle_time = 0.0
+
+    def tearDown(self):
+        self.manager.close()
+        self.tempdir.cleanup()
+
+    def make_image(self, name: str):
+        # Landscape, so that every screen gets exactly one image:
+        path = os.path.join(self.root, name)
+        image = QImage(1600, 900, QImage.Format.Format_RGB32)
+        image.fill(QColor("gray"))
+        image.save(path)
+
+    def get_names(self, screen_idx: int) -> list[str]:
+        return [os.path.basename(image.path) for image in self.manager.get_image_screen(screen_idx, BOUNDS).images]
+
+    def test_shown_screens_are_kept_after_going_back(self):
+        for screen_idx in range(3):
+            self.get_names(screen_idx)
+            self.manager.prefetch(screen_idx, BOUNDS)
+        self.manager.prefetch(0, BOUNDS)
+        self.assertEqual(self.get_names(0), ["1.jpg"])
+
+        self.make_image("1b.jpg")
+        self.manager._ImageFileManager__on_dirs_changed([self.root])  # type: ignore
+
+        self.assertEqual([self.get_names(screen_idx) for screen_idx in range(5)], [
+            ["1.jpg"], ["2.jpg"], ["3.jpg"], ["1b.jpg"], ["4.jpg"],
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()